@@ -1,46 +1,22 @@
 # main.py
-import os
 import json
-from google import genai
-from dotenv import load_dotenv
-
-# Load environment (.env)
-load_dotenv()
-
-# Client otomatis membaca GEMINI_API_KEY
-client = genai.Client()
-
-
-# Fungsi membaca semua file JSON dalam folder SaveJson/
-def load_multiple_json(folder_path="SaveJson"):
-    combined_data = {}
-
-    # Pastikan folder ada
-    if not os.path.exists(folder_path):
-        print(f"Folder '{folder_path}' tidak ditemukan!")
-        return combined_data
-
-    # Membaca semua file json
-    for file in os.listdir(folder_path):
-        if file.endswith(".json"):
-            file_path = os.path.join(folder_path, file)
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    combined_data[file] = json.load(f)
-            except Exception as e:
-                print(f"Gagal membaca {file}: {e}")
-
-    return combined_data
+import re
+from ai_recommender import get_client
+from chat_retrieval import ContextRetriever
+from review_manager import PENDING_STATUS_BY_ROLE
+import summary_index
 
 
 # ------------------------------------------------------------
 # Fungsi untuk bertanya ke Gemini
 # ------------------------------------------------------------
-def ask_gemini(question, context_json):
+def ask_gemini(question, retriever):
+    # hanya record yang relevan (top-K, dibatasi budget token) yang masuk ke prompt
+    context_records = retriever.build_context(question)
     prompt = f"""
-Kamu adalah AI yang memahami data berikut (berasal dari banyak file JSON):
+Kamu adalah AI yang memahami data berikut (record prediksi, rekomendasi, dan review yang relevan):
 
-{json.dumps(context_json, indent=2)}
+{json.dumps(context_records, ensure_ascii=False, separators=(",", ":"), default=str)}
 
 Jawablah pertanyaan berikut berdasarkan data di atas:
 
@@ -48,7 +24,8 @@ Pertanyaan:
 {question}
 """
 
-    response = client.models.generate_content(
+    # client Gemini baru dibuat di sini (pertanyaan agregat tidak membutuhkannya)
+    response = get_client().models.generate_content(
         model="gemini-2.0-flash",
         contents=prompt
     )
@@ -56,19 +33,148 @@ Pertanyaan:
     return response.text
 
 
+# ------------------------------------------------------------
+# Jawaban lokal dari ringkasan (tanpa memanggil LLM)
+# ------------------------------------------------------------
+_OPEN_ENDED = re.compile(r"\b(kenapa|mengapa|why|jelaskan|explain|bagaimana|how to|saran|sarankan|analisis)\b")
+_COUNT = re.compile(r"\b(berapa|jumlah|how many|count|total)\b")
+_MOST = re.compile(r"\b(paling sering|paling banyak|terbanyak|dominan|most common|most frequent)\b")
+_LATEST = re.compile(r"\b(terakhir|terbaru|latest|last|most recent)\b")
+_PENDING = re.compile(r"\b(pending|menunggu|belum di ?review)\b")
+_RECS = re.compile(r"\b(rekomendasi|recommendations?)\b")
+_PREDS = re.compile(r"\b(prediksi|predictions?)\b")
+_REVIEWS = re.compile(r"\b(review|reviews|ulasan)\b")
+_DATE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+_PERIODS = (
+    ("today", re.compile(r"\b(hari ini|today)\b"), "hari ini"),
+    ("yesterday", re.compile(r"\b(kemarin|yesterday)\b"), "kemarin"),
+    ("week", re.compile(r"\b(minggu ini|pekan ini|this week)\b"), "minggu ini"),
+    ("month", re.compile(r"\b(bulan ini|this month)\b"), "bulan ini"),
+)
+# keterangan waktu yang masih tersisa setelah tanggal & periode di atas dihapus
+# (mis. "minggu lalu", "last 3 days") → periodenya tidak dipahami
+_TIME_WORDS = re.compile(
+    r"\b(hari|minggu|pekan|bulan|tahun|jam|lalu|sejak|sebelum|setelah|"
+    r"days?|weeks?|months?|years?|hours?|ago|since|before|after)\b"
+)
+
+
+def _mentioned(text, names):
+    return [n for n in names if n and (n.lower() in text or n.lower().replace("_", " ") in text)]
+
+
+def _period(text):
+    """
+    (since, until, label) dari tanggal/periode di pertanyaan, (None, None, "sepanjang data")
+    jika tidak ada keterangan waktu, atau None jika ada keterangan waktu yang tidak dikenali.
+    """
+    dates = sorted(_DATE.findall(text))
+    rest = _DATE.sub(" ", text)
+    found = []
+    for key, pattern, label in _PERIODS:
+        if pattern.search(rest):
+            found.append((key, label))
+            rest = pattern.sub(" ", rest)
+    if _TIME_WORDS.search(rest) or len(found) + bool(dates) > 1:
+        return None
+    if dates:
+        label = dates[0] if dates[0] == dates[-1] else f"{dates[0]} s/d {dates[-1]}"
+        return dates[0], dates[-1], f"pada {label}"
+    if found:
+        key, label = found[0]
+        since, until = summary_index.period_range(key)
+        return since, until, label
+    return None, None, "sepanjang data"
+
+
+def _format_counts(counts):
+    return ", ".join(f"{key}: {n}" for key, n in counts.most_common())
+
+
+def answer_locally(question):
+    """
+    Menjawab pertanyaan agregat sederhana (jumlah, paling sering, terbaru) langsung
+    dari summary_index. Mengembalikan None jika pertanyaan perlu dijawab LLM, termasuk
+    jika keterangan waktunya tidak dipahami atau tidak berlaku untuk jawaban lokal.
+    """
+    text = question.lower()
+    if _OPEN_ENDED.search(text):
+        return None
+    period = _period(text)
+    if period is None:
+        return None
+    since, until, period_label = period
+    # rekomendasi (status) dan prediksi terbaru tidak punya dimensi waktu di ringkasan
+    undated = since is None
+    counting = bool(_COUNT.search(text))
+
+    summary = summary_index.load_summary()
+    models = set(summary["predictions"]["latest"]) | {m for m, _ in summary_index.recommendation_counts()}
+    model = next(iter(_mentioned(text, models)), None)
+    role = next(iter(_mentioned(text, PENDING_STATUS_BY_ROLE)), None)
+    model_label = f" model {model}" if model else ""
+
+    if _PENDING.search(text) and role and undated:
+        status = PENDING_STATUS_BY_ROLE[role]
+        n = summary_index.recommendation_status_counts(model).get(status, 0)
+        return f"Ada {n} rekomendasi{model_label} yang menunggu review {role}."
+
+    if _MOST.search(text) and (_PREDS.search(text) or model):
+        counts = summary_index.prediction_counts(model, since, until)
+        if not counts:
+            return f"Belum ada prediksi{model_label} {period_label}."
+        label, n = counts.most_common(1)[0]
+        return (f"Prediksi{model_label} paling sering {period_label}: {label} "
+                f"({n} dari {sum(counts.values())}).")
+
+    if _LATEST.search(text) and model and undated and not counting:
+        latest = summary_index.latest_prediction(model)
+        if latest is None:
+            return f"Belum ada prediksi untuk model {model}."
+        return (f"Prediksi terakhir model {model} ({latest.get('Timestamp')}): "
+                f"{latest.get('Prediction')}.")
+
+    if not counting:
+        return None
+
+    if _RECS.search(text):
+        if not undated:
+            return None
+        counts = summary_index.recommendation_status_counts(model)
+        statuses = _mentioned(text, counts)
+        if statuses:
+            return f"Jumlah rekomendasi{model_label} berstatus {statuses[0]}: {counts[statuses[0]]}."
+        return f"Total {sum(counts.values())} rekomendasi{model_label} ({_format_counts(counts) or '-'})."
+
+    if _REVIEWS.search(text):
+        counts = summary_index.review_counts(role, since, until)
+        role_label = f" oleh {role}" if role else ""
+        return f"Total {sum(counts.values())} review{role_label} {period_label} ({_format_counts(counts) or '-'})."
+
+    if _PREDS.search(text) or model:
+        if model:
+            counts = summary_index.prediction_counts(model, since, until)
+        else:
+            counts = summary_index.prediction_counts_by_model(since, until)
+        return f"Total {sum(counts.values())} prediksi{model_label} {period_label} ({_format_counts(counts) or '-'})."
+
+    return None
+
+
 # ------------------------------------------------------------
 # Chatbox CLI
 # ------------------------------------------------------------
 def chatbox():
     print("=== Chatbox AI – Pembaca Banyak JSON (Folder: SaveJson/) ===")
 
-    context_json = load_multiple_json("SaveJson")
+    retriever = ContextRetriever()
+    retriever.refresh()
 
-    if not context_json:
-        print("❌ Tidak ada file JSON ditemukan dalam folder SaveJson/")
+    if not len(retriever.index):
+        print("❌ Tidak ada data ditemukan dalam folder SaveJson/")
         return
 
-    print(f"✔ {len(context_json)} file JSON berhasil dimuat!")
+    print(f"✔ {len(retriever.index)} record berhasil diindeks!")
     print("Ketik 'exit' untuk keluar.\n")
 
     while True:
@@ -78,7 +184,8 @@ def chatbox():
             print("Keluar dari chatbox...")
             break
 
-        answer = ask_gemini(question, context_json)
+        # pertanyaan agregat dijawab dari ringkasan; sisanya ke Gemini
+        answer = answer_locally(question) or ask_gemini(question, retriever)
         print(f"\nAI: {answer}\n")
 
 
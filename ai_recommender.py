@@ -3,24 +3,109 @@
 # ai_recommender.py
 import json
 import os
-from google import genai
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 load_dotenv()
 
-client = genai.Client()
+from llm_cache import get_response_cache, recommendation_cache_key
 
-def _call_gemini(prompt: str, model_name: str = "gemini-2.0-flash") -> str:
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    Client Gemini dibuat saat pertama kali LLM dipanggil, bukan saat import:
+    google.genai berat di-import dan CLI untuk list/review tidak membutuhkannya.
+    Client otomatis membaca GEMINI_API_KEY.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from google import genai
+                _client = genai.Client()
+    return _client
+
+# Konfigurasi pemanggilan paralel (bisa diatur via .env)
+GEMINI_CONCURRENCY = int(os.getenv("GEMINI_CONCURRENCY", 4))
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", 60))          # batas request per menit
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", 3))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", 1.0))
+GEMINI_BACKOFF_MAX = 30.0
+
+# kode HTTP & status gRPC yang layak dicoba ulang (rate limit, server sibuk, timeout).
+# Dicocokkan dengan atribut error (code/status_code/status), bukan teks pesan error.
+_TRANSIENT_CODES = {408, 429, 500, 502, 503, 504}
+_TRANSIENT_STATUSES = {"RESOURCE_EXHAUSTED", "UNAVAILABLE", "DEADLINE_EXCEEDED", "INTERNAL"}
+
+class TokenBucket:
+    """
+    Rate limiter token bucket (thread-safe).
+    rate_per_sec token ditambahkan tiap detik sampai kapasitas; acquire() menunggu token tersedia.
+    """
+
+    def __init__(self, rate_per_sec: float, capacity: float = None):
+        self.rate = rate_per_sec
+        self.capacity = capacity if capacity is not None else max(1.0, rate_per_sec)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+def _is_transient(error: Exception) -> bool:
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if code in _TRANSIENT_CODES:
+        return True
+    # google.genai.errors.APIError menyimpan status gRPC di .status (mis. "UNAVAILABLE")
+    return getattr(error, "status", None) in _TRANSIENT_STATUSES
+
+def _call_gemini(prompt: str, model_name: str = "gemini-2.0-flash", llm_client=None,
+                 rate_limiter: TokenBucket = None, max_retries: int = GEMINI_MAX_RETRIES) -> str:
     """
     Panggil Gemini dan kembalikan text response.
+    Error sementara (429/5xx/timeout) dicoba ulang dengan exponential backoff.
+    llm_client bisa diganti client lain (mis. fake client lokal) dengan interface
+    client.models.generate_content(model=..., contents=...).
     """
-    try:
-        response = client.models.generate_content(
-            model=model_name,
-            contents=prompt
-        )
-        return response.text.strip()
-    except Exception as e:
-        return json.dumps({"error": f"Failed to call Gemini: {str(e)}"})
+    llm_client = llm_client or get_client()
+    attempt = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        try:
+            response = llm_client.models.generate_content(
+                model=model_name,
+                contents=prompt
+            )
+            return response.text.strip()
+        except Exception as e:
+            if attempt < max_retries and _is_transient(e):
+                delay = min(GEMINI_BACKOFF_MAX, GEMINI_BACKOFF_BASE * (2 ** attempt))
+                time.sleep(delay * random.uniform(0.5, 1.0))
+                attempt += 1
+                continue
+            return json.dumps({"error": f"Failed to call Gemini: {str(e)}"})
+
+def is_error_output(ai_out) -> bool:
+    """Hasil gagal (Gemini error setelah retry / JSON tidak valid): tidak di-cache, tidak disimpan."""
+    return isinstance(ai_out, dict) and "error" in ai_out
 
 def build_prompt_for_recommendation(model_name, prediction, probabilities, sorted_labels, inputs):
     prompt = f"""
@@ -44,17 +129,55 @@ Berikan 3-6 action pada setiap list bila relevan. Jawaban harus hanya JSON.
 """
     return prompt
 
-def generate_recommendations_with_gemini(model_name, prediction, probabilities, sorted_labels, inputs):
+def generate_recommendations_with_gemini(model_name, prediction, probabilities, sorted_labels, inputs,
+                                         llm_client=None, rate_limiter=None, use_cache=True):
+    # prompt deterministik → jawaban untuk input yang sama diambil dari cache
+    cache = get_response_cache() if use_cache else None
+    cache_key = None
+    if cache is not None:
+        cache_key = recommendation_cache_key(model_name, prediction, probabilities, sorted_labels, inputs)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
     prompt = build_prompt_for_recommendation(model_name, prediction, probabilities, sorted_labels, inputs)
-    raw = _call_gemini(prompt)
+    raw = _call_gemini(prompt, llm_client=llm_client, rate_limiter=rate_limiter)
     # coba parse JSON
     try:
         parsed = json.loads(raw)
+        if cache is not None and not is_error_output(parsed):
+            cache.set(cache_key, parsed)
         return parsed
     except Exception:
         # fallback: bungkus raw text ke field raw jika tidak bisa parse
         return {"error": "Gemini tidak mengembalikan JSON valid", "raw": raw}
 
+def generate_recommendations_concurrently(payloads, concurrency=GEMINI_CONCURRENCY, rpm=GEMINI_RPM, llm_client=None):
+    """
+    Generate rekomendasi untuk banyak payload secara paralel (thread pool).
+    payloads: iterable tuple (model_name, prediction, probabilities, sorted_labels, inputs).
+    - jumlah request berjalan dibatasi `concurrency`
+    - laju request dibatasi token bucket `rpm` (request per menit, 0 = tanpa batas)
+    - hasil di-yield berurutan sesuai urutan payload: (payload, hasil)
+    Payload dibaca secara lazy; yang sedang diproses paling banyak 2x concurrency.
+    """
+    concurrency = max(1, int(concurrency))
+    rate_limiter = TokenBucket(rpm / 60.0) if rpm else None
+    window = concurrency * 2
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="gemini") as pool:
+        in_flight = deque()
+        for payload in payloads:
+            future = pool.submit(generate_recommendations_with_gemini, *payload,
+                                 llm_client=llm_client, rate_limiter=rate_limiter)
+            in_flight.append((payload, future))
+            if len(in_flight) >= window:
+                done_payload, done_future = in_flight.popleft()
+                yield done_payload, done_future.result()
+        while in_flight:
+            done_payload, done_future = in_flight.popleft()
+            yield done_payload, done_future.result()
+
 def build_prompt_for_revision(original_payload, reviewer_comments):
     prompt = f"""
 Seseorang (planner) menolak rekomendasi sebelumnya dengan komentar: {reviewer_comments}
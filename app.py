@@ -1,22 +1,47 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import Dict, Any
+from typing import Dict, Any, List
 from datetime import datetime
+from contextlib import asynccontextmanager
 import uvicorn
 
+from inference_pool import QueueFullError, get_inference_pool, start_inference_pool, stop_inference_pool
+from prediction_log import get_log_sink, start_log_sink, stop_log_sink
 from prediction_utils import (
     models_config,
-    load_model,
-    normalize_input,
+    get_model,
+    warm_up_in_background,
+    model_health,
+    get_normalizer,
     predict_with_model,
+    predict_batch_with_model,
     save_prediction_to_json,
-    get_test_inputs
+    get_test_inputs,
+    model_load_metrics
 )
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Muat semua model sekali saat startup di thread latar (paralel sebanyak core,
+    # MVCO_LOAD_WORKERS): server langsung menerima koneksi dan tiap model bisa dipakai
+    # begitu siap; status di GET /health
+    warm_up_in_background()
+    # Log prediksi ditulis oleh thread latar, bukan di dalam request
+    start_log_sink()
+    # Inferensi berjalan di thread pool agar event loop tetap menerima koneksi
+    start_inference_pool()
+    yield
+    stop_inference_pool()
+    stop_log_sink()
+
+
 app = FastAPI(
     title="AI Prediction API",
     description="FastAPI backend untuk sistem prediksi multi-model",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # ==============================
@@ -28,34 +53,82 @@ class PredictionRequest(BaseModel):
     inputs: Dict[str, Any]
 
 
+class BatchPredictionRequest(BaseModel):
+    model_name: str
+    inputs: List[Dict[str, Any]]
+
+
 # ==============================
 # ROUTES
 # ==============================
 
-@app.get("/")
-def root():
-    return {
-        "message": "✅ API Aktif",
-        "available_models": [cfg["name"] for cfg in models_config]
-    }
+def _load(model_name):
+    try:
+        return get_model(model_name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Model '{model_name}' tidak ditemukan.")
 
 
-@app.post("/predict")
-def predict(request: PredictionRequest):
-    model_cfg = next((cfg for cfg in models_config if cfg["name"] == request.model_name), None)
-    if not model_cfg:
-        raise HTTPException(status_code=404, detail=f"Model '{request.model_name}' tidak ditemukan.")
+_MODEL_NAMES = {cfg["name"] for cfg in models_config}
 
-    model, feat_order = load_model(model_cfg["file"])
-    features = feat_order or model_cfg["features"]
 
+async def _run(model_name, fn, *args):
+    """Menjalankan kerja blocking di pool inferensi dengan batas konkurensi per model."""
+    if model_name not in _MODEL_NAMES:
+        # ditolak sebelum masuk pool agar nama sembarang tidak menambah semaphore/metrik
+        raise HTTPException(status_code=404, detail=f"Model '{model_name}' tidak ditemukan.")
     try:
-        input_values = [normalize_input(request.inputs.get(f, 0), f) for f in features]
+        return await get_inference_pool().run(model_name, fn, *args)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+def _predict_one(request: PredictionRequest):
+    model, features = _load(request.model_name)
+
+    try:
+        input_values = get_normalizer(features).normalize_row(request.inputs)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error input: {e}")
 
     prediction, prob = predict_with_model(model, input_values, features)
     save_prediction_to_json(request.model_name, features, input_values, prediction, prob)
+    return features, prediction, prob
+
+
+def _predict_many(request: BatchPredictionRequest):
+    model, features = _load(request.model_name)
+
+    try:
+        rows = get_normalizer(features).normalize_rows(request.inputs)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error input: {e}")
+
+    outputs = predict_batch_with_model(model, rows, features)
+    for input_values, (prediction, prob) in zip(rows, outputs):
+        save_prediction_to_json(request.model_name, features, input_values, prediction, prob)
+    return features, outputs
+
+
+def _predict_test(model_name, data):
+    model, features = _load(model_name)
+    input_values = get_normalizer(features).normalize_row(data)
+    prediction, prob = predict_with_model(model, input_values, features)
+    save_prediction_to_json(model_name, features, input_values, prediction, prob)
+    return prediction, prob
+
+
+@app.get("/")
+async def root():
+    return {
+        "message": "✅ API Aktif",
+        "available_models": [cfg["name"] for cfg in models_config]
+    }
+
+
+@app.post("/predict")
+async def predict(request: PredictionRequest):
+    features, prediction, prob = await _run(request.model_name, _predict_one, request)
 
     return {
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -66,23 +139,35 @@ def predict(request: PredictionRequest):
     }
 
 
+@app.post("/predict/batch")
+async def predict_batch(request: BatchPredictionRequest):
+    features, outputs = await _run(request.model_name, _predict_many, request)
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    results = []
+    for item, (prediction, prob) in zip(request.inputs, outputs):
+        results.append({
+            "prediction": prediction,
+            "probabilities": prob,
+            "inputs_used": {f: item.get(f, None) for f in features}
+        })
+
+    return {
+        "timestamp": timestamp,
+        "model": request.model_name,
+        "count": len(results),
+        "results": results
+    }
+
+
 @app.get("/test/{model_name}")
-def test_model(model_name: str):
+async def test_model(model_name: str):
     test_data = get_test_inputs()
     if model_name not in test_data:
         raise HTTPException(status_code=404, detail=f"Data test untuk '{model_name}' tidak ada.")
 
-    model_cfg = next((cfg for cfg in models_config if cfg["name"] == model_name), None)
-    if not model_cfg:
-        raise HTTPException(status_code=404, detail=f"Model '{model_name}' tidak ditemukan.")
-
-    model, feat_order = load_model(model_cfg["file"])
-    features = feat_order or model_cfg["features"]
-
     data = test_data[model_name]
-    input_values = [normalize_input(data[f], f) for f in features]
-    prediction, prob = predict_with_model(model, input_values, features)
-    save_prediction_to_json(model_name, features, input_values, prediction, prob)
+    prediction, prob = await _run(model_name, _predict_test, model_name, data)
 
     return {
         "model": model_name,
@@ -92,5 +177,27 @@ def test_model(model_name: str):
     }
 
 
+@app.get("/health")
+async def health():
+    """200 jika minimal satu model siap (status ok/degraded), 503 jika belum/tidak ada."""
+    report = model_health()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+
+@app.get("/metrics")
+async def metrics():
+    sink = get_log_sink()
+    return {
+        "inference": get_inference_pool().metrics(),
+        "model_load": model_load_metrics(),
+        "log_sink": {
+            "running": sink is not None,
+            "queue_depth": sink.pending if sink else 0,
+            "written": sink.written if sink else 0,
+            "dropped": sink.dropped if sink else 0,
+        },
+    }
+
+
 if __name__ == "__main__":
     uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
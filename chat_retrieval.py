@@ -0,0 +1,305 @@
+# indeks retrieval (BM25 + filter) untuk konteks ChatBox yang dibatasi token
+
+# chat_retrieval.py
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Tuple
+
+from prediction_log import LEGACY_LOG_PATH, list_log_segments, read_from_cursor, sync_log_cursors
+from review_manager import REVIEWS_PATH
+from storage import RECS_DB_PATH, load_json, recommendation_changes, recommendation_counts
+
+# Budget konteks per pertanyaan (perkiraan kasar: 1 token ≈ 4 karakter)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKENS", 6000))
+CONTEXT_TOP_K = int(os.getenv("CHAT_CONTEXT_TOP_K", 20))
+CHARS_PER_TOKEN = 4
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+_DATE_RE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+
+
+def tokenize(text: str) -> List[str]:
+    # underscore ikut dipisah: "Temperature_C" → ["temperature", "c"]
+    return _TOKEN_RE.findall(text.lower().replace("_", " "))
+
+
+def _flatten_text(value: Any, out: List[str]):
+    if isinstance(value, dict):
+        for key, val in value.items():
+            out.append(str(key))
+            _flatten_text(val, out)
+    elif isinstance(value, (list, tuple)):
+        for val in value:
+            _flatten_text(val, out)
+    elif value is not None:
+        out.append(str(value))
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class Document:
+    __slots__ = ("doc_id", "kind", "model", "status", "day", "record", "length", "terms")
+
+    def __init__(self, doc_id, kind, model, status, day, record):
+        self.doc_id = doc_id
+        self.kind = kind
+        self.model = model
+        self.status = status
+        self.day = day
+        self.record = record
+        self.length = 0
+        self.terms = ()
+
+
+def _prediction_doc(doc_id: str, rec: Dict) -> Document:
+    ts = str(rec.get("Timestamp") or "")
+    return Document(doc_id, "prediction", rec.get("Model"), None, ts[:10], rec)
+
+
+def _recommendation_doc(rec: Dict) -> Document:
+    ts = str(rec.get("timestamp") or "")
+    return Document(f"rec:{rec.get('id')}", "recommendation", rec.get("model"), rec.get("status"), ts[:10], rec)
+
+
+def _review_doc(rec: Dict) -> Document:
+    ts = str(rec.get("timestamp") or "")
+    return Document(f"review:{rec.get('id')}", "review", None, rec.get("action"), ts[:10], rec)
+
+
+class BM25Index:
+    """
+    Indeks BM25 in-memory dengan posting list per term. Dokumen dikelompokkan per
+    sumber (file/tabel) sehingga satu sumber bisa diganti tanpa membangun ulang semuanya.
+    """
+
+    def __init__(self):
+        self.docs: Dict[str, Document] = {}
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.by_source: Dict[str, Dict[str, None]] = {}   # sumber → doc_id (urut masuk)
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.docs)
+
+    def _add(self, doc: Document):
+        parts = [doc.kind, doc.model or "", doc.status or ""]
+        _flatten_text(doc.record, parts)
+        terms = Counter(tokenize(" ".join(parts)))
+        doc.length = sum(terms.values())
+        doc.terms = tuple(terms)
+        self.docs[doc.doc_id] = doc
+        self.total_length += doc.length
+        for term, tf in terms.items():
+            self.postings[term][doc.doc_id] = tf
+
+    def _remove(self, doc_id: str):
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self.total_length -= doc.length
+        for term in doc.terms:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+
+    def replace_source(self, source: str, docs: Iterable[Document]):
+        for doc_id in self.by_source.pop(source, {}):
+            self._remove(doc_id)
+        self.extend_source(source, docs)
+
+    def extend_source(self, source: str, docs: Iterable[Document]):
+        """Menambah/mengganti (berdasarkan doc_id) dokumen sebuah sumber tanpa menyentuh sisanya."""
+        ids = self.by_source.setdefault(source, {})
+        for doc in docs:
+            if doc.doc_id in self.docs:
+                self._remove(doc.doc_id)
+            self._add(doc)
+            ids[doc.doc_id] = None
+
+    def drop_source(self, source: str):
+        self.replace_source(source, [])
+
+    def search(self, query: str, accept=None) -> List[Tuple[float, Document]]:
+        """Skor BM25 untuk dokumen yang memuat minimal satu term query (dan lolos filter)."""
+        n = len(self.docs)
+        if not n:
+            return []
+        avg_len = self.total_length / n
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                length = self.docs[doc_id].length
+                scores[doc_id] += idf * tf * (BM25_K1 + 1) / (
+                    tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_len)
+                )
+        hits = [(score, self.docs[doc_id]) for doc_id, score in scores.items()]
+        if accept is not None:
+            hits = [hit for hit in hits if accept(hit[1])]
+        hits.sort(key=lambda hit: (-hit[0], hit[1].doc_id))
+        return hits
+
+
+def _stat_signature(*paths: str) -> Tuple:
+    sig = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            sig.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            sig.append(None)
+    return tuple(sig)
+
+
+class ContextRetriever:
+    """
+    Memilih record prediksi/rekomendasi/review yang relevan untuk satu pertanyaan.
+    refresh() hanya membaca data baru: file log dari byte terakhir yang diindeks,
+    rekomendasi dengan revisi (rev) lebih baru, dan review yang belum diindeks.
+    """
+
+    def __init__(self, token_budget: int = CONTEXT_TOKEN_BUDGET, top_k: int = CONTEXT_TOP_K):
+        self.token_budget = token_budget
+        self.top_k = top_k
+        self.index = BM25Index()
+        self._log_cursors: Dict[str, Dict] = {}
+        self._legacy_signature = None
+        self._recs_signature = None
+        self._recs_rev = 0
+        self._reviews_signature = None
+        self._lock = threading.Lock()
+
+    # ---------------- sumber data ----------------
+    def _refresh_logs(self) -> int:
+        signature = _stat_signature(LEGACY_LOG_PATH)
+        if signature != self._legacy_signature:
+            # format lama (JSON array) tidak bisa dibaca sebagian; file ini praktis tidak berubah lagi
+            records = load_json(LEGACY_LOG_PATH, [])
+            records = records if isinstance(records, list) else [records]
+            self.index.replace_source(LEGACY_LOG_PATH, (
+                _prediction_doc(f"pred:legacy:{i}", rec) for i, rec in enumerate(records)
+            ))
+            self._legacy_signature = signature
+
+        dropped, pending = sync_log_cursors(self._log_cursors, list_log_segments())
+        for key in dropped:
+            self.index.drop_source(f"log:{key}")
+        for key, path in pending:
+            self.index.extend_source(f"log:{key}", (
+                _prediction_doc(f"pred:{key}:{offset}", rec)
+                for offset, rec in read_from_cursor(self._log_cursors[key], path)
+            ))
+        return len(pending)
+
+    def _refresh_recommendations(self) -> int:
+        signature = _stat_signature(RECS_DB_PATH, RECS_DB_PATH + "-wal")
+        if signature == self._recs_signature:
+            return 0
+        changed, self._recs_rev = recommendation_changes(self._recs_rev)
+        self.index.extend_source("recommendations", (_recommendation_doc(rec) for rec in changed))
+        if len(self.index.by_source["recommendations"]) != sum(recommendation_counts().values()):
+            # ada rekomendasi yang dihapus: indeks ulang seluruh tabel
+            changed, self._recs_rev = recommendation_changes(0)
+            self.index.replace_source("recommendations", (_recommendation_doc(rec) for rec in changed))
+        self._recs_signature = signature
+        return 1
+
+    def _refresh_reviews(self) -> int:
+        signature = _stat_signature(REVIEWS_PATH)
+        if signature == self._reviews_signature:
+            return 0
+        reviews = load_json(REVIEWS_PATH, [])
+        indexed = len(self.index.by_source.get("reviews", ()))
+        if len(reviews) >= indexed:
+            # review hanya ditambahkan di akhir list
+            self.index.extend_source("reviews", (_review_doc(rec) for rec in reviews[indexed:]))
+        else:
+            self.index.replace_source("reviews", (_review_doc(rec) for rec in reviews))
+        self._reviews_signature = signature
+        return 1
+
+    def refresh(self) -> int:
+        """Sinkronisasi indeks dengan sumber data; mengembalikan jumlah sumber yang punya data baru."""
+        changed = 0
+        with self._lock:
+            for step in (self._refresh_logs, self._refresh_recommendations, self._refresh_reviews):
+                try:
+                    changed += step()
+                except Exception as e:
+                    print(f"Gagal memperbarui indeks ({step.__name__}): {e}")
+        return changed
+
+    # ---------------- pemilihan konteks ----------------
+    @staticmethod
+    def infer_filters(question: str, models: Iterable[str] = None, statuses: Iterable[str] = None) -> Dict:
+        """Filter terstruktur dari teks pertanyaan: nama model, status, dan tanggal (YYYY-MM-DD)."""
+        text = question.lower()
+        filters = {}
+        found = [m for m in (models or []) if m and re.search(rf"\b{re.escape(m.lower())}\b", text)]
+        if found:
+            filters["model"] = set(found)
+        found = [s for s in (statuses or []) if s and s.lower() in text]
+        if found:
+            filters["status"] = set(found)
+        dates = sorted(_DATE_RE.findall(question))
+        if dates:
+            filters["since"], filters["until"] = dates[0], dates[-1]
+        return filters
+
+    def retrieve(self, question: str, model: str = None, status: str = None,
+                 since: str = None, until: str = None, k: int = None) -> List[Document]:
+        """Top-K dokumen relevan (BM25) yang lolos filter; tanpa kecocokan, pakai record terbaru."""
+        self.refresh()
+        docs = self.index.docs.values()
+        inferred = self.infer_filters(
+            question,
+            models={d.model for d in docs if d.model},
+            statuses={d.status for d in docs if d.status},
+        )
+        models = {model} if model else inferred.get("model")
+        statuses = {status} if status else inferred.get("status")
+        since = since or inferred.get("since")
+        until = until or inferred.get("until")
+
+        def accept(doc: Document) -> bool:
+            if models and doc.model is not None and doc.model not in models:
+                return False
+            if statuses and doc.kind != "prediction" and doc.status not in statuses:
+                return False
+            if since and doc.day and doc.day < since:
+                return False
+            if until and doc.day and doc.day > until:
+                return False
+            return True
+
+        k = k or self.top_k
+        hits = [doc for _, doc in self.index.search(question, accept)]
+        if not hits:
+            hits = sorted((d for d in docs if accept(d)), key=lambda d: d.day or "", reverse=True)
+        return hits[:k]
+
+    def build_context(self, question: str, **filters) -> List[Dict]:
+        """Record terpilih (dikelompokkan per jenis) yang muat dalam budget token."""
+        context, used = [], 0
+        for doc in self.retrieve(question, **filters):
+            text = json.dumps(doc.record, ensure_ascii=False, separators=(",", ":"), default=str)
+            cost = estimate_tokens(text)
+            if used + cost > self.token_budget:
+                continue   # record besar dilewati, record kecil berikutnya mungkin masih muat
+            context.append({"type": doc.kind, "record": doc.record})
+            used += cost
+        return context
@@ -0,0 +1,67 @@
+# ekspor data tersimpan (compact/biner) ke JSON pretty untuk dibaca manusia
+
+# export_json.py
+import argparse
+import json
+import os
+import sys
+from typing import Any, Iterator
+
+from prediction_log import iter_log_file, iter_predictions
+from review_manager import REVIEWS_PATH
+from storage import iter_jsonl, load_json, query_recommendations
+
+SOURCES = ("predictions", "recommendations", "reviews")
+
+
+def iter_source(source: str) -> Iterator[Any]:
+    """
+    Mengembalikan record dari sumber bernama (predictions/recommendations/reviews)
+    atau dari file: .json (array/objek), .jsonl, atau .msgpack.
+    """
+    if source == "predictions":
+        return iter_predictions()
+    if source == "recommendations":
+        return iter(query_recommendations())
+    if source == "reviews":
+        return iter(load_json(REVIEWS_PATH, [], mutable=True))
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"Sumber '{source}' tidak ditemukan.")
+    if source.endswith(".msgpack"):
+        return iter_log_file(source)
+    if source.endswith(".jsonl"):
+        return iter_jsonl(source)
+    data = load_json(source, mutable=True)
+    return iter(data if isinstance(data, list) else [data])
+
+
+def export(source: str, out, indent: int = 2) -> int:
+    """Menulis record sebagai JSON array ber-indent secara streaming. Mengembalikan jumlah record."""
+    count = 0
+    out.write("[")
+    for record in iter_source(source):
+        out.write(",\n" if count else "\n")
+        body = json.dumps(record, indent=indent, ensure_ascii=False, default=str)
+        out.write("\n".join(" " * indent + line for line in body.splitlines()))
+        count += 1
+    out.write("\n]\n" if count else "]\n")
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ekspor data MVCO ke JSON pretty.")
+    parser.add_argument("source", help=f"{' | '.join(SOURCES)} atau path file .json/.jsonl/.msgpack")
+    parser.add_argument("-o", "--output", help="file tujuan (default: stdout)")
+    parser.add_argument("--indent", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            count = export(args.source, f, args.indent)
+        print(f"{count} record → {args.output}", file=sys.stderr)
+    else:
+        export(args.source, sys.stdout, args.indent)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+# kompilasi Random Forest ke array NumPy datar + evaluator level-sinkron (bisa di-mmap)
+
+# forest_compiler.py
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+COMPILED_DIR = os.getenv("MVCO_COMPILED_DIR", "models/compiled")
+# MVCO_MMAP=0: array hasil ekspor dibaca ke memori alih-alih di-mmap
+MMAP_ENABLED = os.getenv("MVCO_MMAP", "1") != "0"
+ARRAY_NAMES = ("feature", "threshold", "children", "is_leaf", "missing_left", "value", "roots")
+# Versi layout array; ekspor dengan versi lain diabaikan (diratakan ulang dari .pkl)
+FORMAT_VERSION = 2
+# Set aktif traversal dipadatkan setiap sekian level
+COMPACT_EVERY = 4
+
+
+class CompiledForest:
+    """
+    Semua pohon forest dalam array datar (node pohon ke-t dimulai di roots[t]):
+    - feature/threshold: split per node
+    - children: [kiri, kanan] per node berselang-seling → anak = children[2*node + ke_kanan];
+      leaf menunjuk ke dirinya sendiri (threshold +inf) sehingga tetap di tempat
+    - value: probabilitas kelas per leaf (sudah dinormalisasi seperti sklearn)
+    Hasil predict_proba identik dengan RandomForestClassifier.predict_proba.
+    """
+
+    def __init__(self, arrays, classes, n_features, max_depth):
+        for name in ARRAY_NAMES:
+            setattr(self, name, arrays[name])
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = int(n_features)
+        self.max_depth = int(max_depth)
+        self.n_trees = len(self.roots)
+
+    def apply(self, X):
+        """
+        Index leaf untuk setiap (sampel, pohon). Semua pasangan (sampel, pohon)
+        turun satu level per iterasi; yang sudah sampai leaf diam di leaf-nya dan
+        dikeluarkan dari set aktif setiap COMPACT_EVERY level.
+        """
+        # sklearn membandingkan X float32 dengan threshold float64
+        X = np.asarray(X, dtype=np.float32)
+        n, n_features = X.shape
+        flat_x = X.ravel()
+        has_nan = bool(np.isnan(flat_x).any())
+
+        node = np.tile(self.roots, n)
+        active = np.flatnonzero(~self.is_leaf[node])
+        current = node[active]
+        row_base = (active // self.n_trees) * n_features
+        while active.size:
+            for _ in range(COMPACT_EVERY):
+                values = flat_x[row_base + self.feature[current]]
+                go_right = ~(values <= self.threshold[current])
+                if has_nan:
+                    go_right &= ~(np.isnan(values) & self.missing_left[current])
+                current = self.children[2 * current + go_right]
+            leaf = self.is_leaf[current]
+            node[active[leaf]] = current[leaf]
+            keep = ~leaf
+            active, current, row_base = active[keep], current[keep], row_base[keep]
+        return node.reshape(n, self.n_trees)
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        per_tree = self.value[leaves]            # (n, pohon, kelas)
+        # dijumlahkan berurutan pohon demi pohon (seperti sklearn), lalu dibagi jumlah pohon
+        total = np.cumsum(per_tree, axis=1)[:, -1, :]
+        return total / self.n_trees
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+
+
+def _tree_arrays(tree, n_classes, offset):
+    t = tree.tree_
+    is_leaf = t.children_left == -1
+    own = np.arange(offset, offset + t.node_count)
+    children = np.empty(2 * t.node_count, dtype=np.int32)
+    children[0::2] = np.where(is_leaf, own, t.children_left + offset)
+    children[1::2] = np.where(is_leaf, own, t.children_right + offset)
+    feature = np.where(is_leaf, 0, t.feature).astype(np.int32)
+    threshold = np.where(is_leaf, np.inf, t.threshold).astype(np.float64)
+    missing = getattr(t, "missing_go_to_left", None)
+    missing_left = np.zeros(t.node_count, dtype=bool) if missing is None else missing.astype(bool)
+
+    # sama dengan DecisionTreeClassifier.predict_proba: bagi dengan jumlah per baris
+    value = np.array(t.value[:, 0, :n_classes], dtype=np.float64)
+    normalizer = value.sum(axis=1)[:, np.newaxis]
+    normalizer[normalizer == 0.0] = 1.0
+    value /= normalizer
+    return {
+        "feature": feature, "threshold": threshold, "children": children,
+        "is_leaf": is_leaf, "missing_left": missing_left, "value": value,
+    }, int(t.max_depth)
+
+
+def flatten_forest(estimator) -> CompiledForest:
+    """Meratakan RandomForestClassifier/ExtraTreesClassifier (single-output) ke CompiledForest."""
+    from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+
+    if not isinstance(estimator, (RandomForestClassifier, ExtraTreesClassifier)):
+        raise TypeError(f"Estimator {type(estimator).__name__} tidak didukung")
+    if getattr(estimator, "n_outputs_", 1) != 1:
+        raise TypeError("Forest multi-output tidak didukung")
+
+    n_classes = len(estimator.classes_)
+    parts, roots, offset, max_depth = [], [], 0, 0
+    for tree in estimator.estimators_:
+        arrays, depth = _tree_arrays(tree, n_classes, offset)
+        parts.append(arrays)
+        roots.append(offset)
+        offset += tree.tree_.node_count
+        max_depth = max(max_depth, depth)
+
+    arrays = {name: np.concatenate([p[name] for p in parts]) for name in ARRAY_NAMES if name != "roots"}
+    arrays["roots"] = np.asarray(roots, dtype=np.int32)
+    return CompiledForest(arrays, estimator.classes_, estimator.n_features_in_, max_depth)
+
+
+def verify_forest(compiled: CompiledForest, estimator, X) -> bool:
+    """Cek kesetaraan: predict_proba harus identik bit-per-bit dengan estimator asli."""
+    expected = estimator.predict_proba(X)
+    actual = compiled.predict_proba(X)
+    return expected.shape == actual.shape and np.array_equal(expected, actual)
+
+
+def compile_forest(estimator, X_probe):
+    """CompiledForest yang sudah diverifikasi pada X_probe, atau None jika tidak didukung/berbeda."""
+    try:
+        compiled = flatten_forest(estimator)
+    except TypeError:
+        return None
+    return compiled if verify_forest(compiled, estimator, X_probe) else None
+
+
+# ============================================================
+# Artefak di disk (np.save per array → bisa dibuka dengan mmap)
+# ============================================================
+
+def _json_classes(classes):
+    return [c.item() if isinstance(c, np.generic) else c for c in classes]
+
+
+def _write_forest(compiled: CompiledForest, out_dir: str, source: dict = None, pipeline: dict = None):
+    os.makedirs(out_dir, exist_ok=True)
+    for name in ARRAY_NAMES:
+        np.save(os.path.join(out_dir, f"{name}.npy"), getattr(compiled, name))
+    meta = {
+        "format": FORMAT_VERSION,
+        "classes": _json_classes(compiled.classes_),
+        "classes_dtype": compiled.classes_.dtype.str,
+        "n_features": compiled.n_features_in_,
+        "max_depth": compiled.max_depth,
+        "n_trees": compiled.n_trees,
+        "source": source or {},
+        "pipeline": pipeline,
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+
+def _staging_dir(out_dir: str) -> str:
+    """Direktori kosong di sebelah out_dir (filesystem sama → bisa di-rename)."""
+    staging = f"{os.path.normpath(out_dir)}.tmp{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    return staging
+
+
+def _publish(staging: str, out_dir: str):
+    """
+    Mengganti out_dir dengan staging lewat rename. File lama tidak pernah ditulis ulang
+    atau dipotong: proses yang masih me-mmap-nya tetap membaca inode lama. Di antara
+    kedua rename out_dir sesaat tidak ada (pemuat kembali ke .pkl).
+    """
+    out_dir = os.path.normpath(out_dir)
+    old = None
+    if os.path.exists(out_dir):
+        old = f"{out_dir}.old{os.getpid()}"
+        shutil.rmtree(old, ignore_errors=True)
+        os.rename(out_dir, old)
+    try:
+        os.rename(staging, out_dir)
+    except OSError:
+        if old is not None:
+            os.rename(old, out_dir)
+        raise
+    if old is not None:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def save_forest(compiled: CompiledForest, out_dir: str, source: dict = None, pipeline: dict = None):
+    """
+    `pipeline`: tabel preprocessor (pipeline_compiler.pipeline_spec) yang disimpan di meta.json.
+    Ditulis ke direktori sementara lalu di-rename ke out_dir (aman selagi server me-mmap versi lama).
+    """
+    staging = _staging_dir(out_dir)
+    try:
+        _write_forest(compiled, staging, source, pipeline)
+        _publish(staging, out_dir)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def load_forest(out_dir: str, mmap: bool = True) -> CompiledForest:
+    """Memuat forest; dengan mmap array dipetakan dari file (read-only, dibagi antar proses)."""
+    with open(os.path.join(out_dir, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    mode = "r" if mmap else None
+    arrays = {name: np.load(os.path.join(out_dir, f"{name}.npy"), mmap_mode=mode) for name in ARRAY_NAMES}
+    # label tetap bertipe sama dengan classes_ sklearn (mis. object → str Python, bukan numpy.str_)
+    classes = np.asarray(meta["classes"], dtype=np.dtype(meta["classes_dtype"]))
+    compiled = CompiledForest(arrays, classes, meta["n_features"], meta["max_depth"])
+    compiled.meta = meta
+    return compiled
+
+
+def export_is_fresh(model_name: str, model_path: str, out_root: str = COMPILED_DIR) -> bool:
+    """Hasil ekspor ada, formatnya cocok, dan .pkl sumbernya belum berubah sejak diekspor."""
+    try:
+        with open(os.path.join(out_root, model_name, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        st = os.stat(model_path)
+    except (OSError, ValueError):
+        return False
+    source = meta.get("source") or {}
+    return (meta.get("format") == FORMAT_VERSION
+            and source.get("mtime_ns") == st.st_mtime_ns and source.get("size") == st.st_size)
+
+
+def load_exported_forest(model_name: str, model_path: str, out_root: str = COMPILED_DIR):
+    """
+    Forest hasil ekspor jika ada dan .pkl sumbernya belum berubah; selain itu None.
+    Artefak yang rusak menaikkan exception (pemanggil kembali ke .pkl).
+    """
+    if not export_is_fresh(model_name, model_path, out_root):
+        return None
+    return load_forest(os.path.join(out_root, model_name), mmap=MMAP_ENABLED)
+
+
+def export_model(model_name: str, out_root: str = COMPILED_DIR):
+    """
+    Mengekspor model terdaftar (forest + tabel preprocessor) ke <out_root>/<model_name>/.
+    Ekspor dibatalkan (ValueError) jika hasil tidak identik dengan model asli.
+    """
+    from prediction_utils import get_model_config, load_model
+
+    cfg = get_model_config(model_name)
+    if cfg is None:
+        raise KeyError(f"Model '{model_name}' tidak ditemukan.")
+    # dari .pkl langsung: model di registry sudah berupa jalur cepat
+    model, feature_order = load_model(cfg["file"])
+    return export_pipeline(model, feature_order or cfg["features"], cfg["file"],
+                           os.path.join(out_root, model_name))
+
+
+def export_pipeline(model, features, model_path: str, out_dir: str):
+    """
+    Kompilasi offline: preprocessor + forest diverifikasi identik dengan pipeline (jalur
+    DataFrame) pada baris uji, ditulis ke direktori sementara, dimuat ulang lewat jalur yang
+    dipakai saat startup dan diverifikasi sekali lagi, baru kemudian menggantikan out_dir.
+    Saat startup tidak ada verifikasi ulang.
+    """
+    from pipeline_compiler import UnsupportedPipeline, _build, _probe_rows, pipeline_from_spec, pipeline_spec
+    from prediction_utils import ModelSchema
+
+    try:
+        compiled_pipeline = _build(model, features)
+    except UnsupportedPipeline as e:
+        raise ValueError(f"Pipeline tidak bisa dikompilasi: {e}")
+    rows = _probe_rows(compiled_pipeline, n=512)
+    X = compiled_pipeline.transform(rows)
+    estimator = compiled_pipeline.estimator
+
+    compiled = flatten_forest(estimator)
+    if not verify_forest(compiled, estimator, X):
+        raise ValueError("Forest tidak identik dengan model asli; ekspor dibatalkan.")
+    # pastikan juga sama dengan pipeline lengkap (jalur DataFrame)
+    expected = model.predict_proba(ModelSchema.from_model(model, features).build_frame(rows))
+    if not np.array_equal(expected, compiled.predict_proba(X)):
+        raise ValueError("Forest berbeda dari pipeline; ekspor dibatalkan.")
+
+    st = os.stat(model_path)
+    source = {"file": model_path, "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+    # artefak baru dipublikasikan (rename ke out_dir) hanya setelah lolos verifikasi muat ulang;
+    # yang gagal tidak pernah terlihat sebagai hasil ekspor segar
+    staging = _staging_dir(out_dir)
+    try:
+        _write_forest(compiled, staging, source, pipeline_spec(compiled_pipeline))
+        reloaded = load_forest(staging, mmap=MMAP_ENABLED)
+        if not np.array_equal(pipeline_from_spec(reloaded.meta["pipeline"], reloaded).predict_proba(rows), expected):
+            raise ValueError(f"Artefak '{out_dir}' tidak cocok setelah dimuat ulang; ekspor dibatalkan.")
+        _publish(staging, out_dir)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return out_dir
+
+
+def _dir_bytes(path: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def main(argv=None):
+    from prediction_utils import get_model_config, models_config
+
+    parser = argparse.ArgumentParser(description="Ekspor model (Random Forest + preprocessor) ke array NumPy datar.")
+    parser.add_argument("models", nargs="*", help="nama model (default: semua di models_config)")
+    parser.add_argument("--out", default=COMPILED_DIR)
+    parser.add_argument("--force", action="store_true", help="ekspor ulang walaupun hasil ekspor masih segar")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for name in args.models or [cfg["name"] for cfg in models_config]:
+        started = time.perf_counter()
+        cfg = get_model_config(name)
+        out_dir = os.path.join(args.out, name)
+        try:
+            if cfg is not None and not args.force and export_is_fresh(name, cfg["file"], args.out):
+                status = "masih segar"
+            else:
+                out_dir, status = export_model(name, args.out), "diekspor"
+        except Exception as e:
+            failed = True
+            print(f"❌ {name}: {e}")
+            continue
+        print(f"✅ {name} → {out_dir} ({_dir_bytes(out_dir) / 1e6:.1f} MB, {status}) "
+              f"[{time.perf_counter() - started:.1f}s]")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# worker pool inferensi untuk endpoint async: batas konkurensi per model + metrik antrean
+
+# inference_pool.py
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Jumlah thread inferensi. predict_proba RandomForest & operasi NumPy melepas GIL
+# sebagian besar waktunya, jadi thread pool cukup tanpa biaya salin data ke proses lain.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", min(8, os.cpu_count() or 1)))
+# Maksimum request yang dieksekusi bersamaan untuk satu model (default: semua worker)
+MODEL_CONCURRENCY = int(os.getenv("MODEL_CONCURRENCY", INFERENCE_WORKERS))
+# Maksimum request yang boleh mengantre per model; 0 = tanpa batas
+MODEL_MAX_QUEUE = int(os.getenv("MODEL_MAX_QUEUE", 0))
+
+
+class QueueFullError(Exception):
+    """Antrean model penuh; request sebaiknya ditolak (HTTP 503)."""
+
+
+class ModelStats:
+    __slots__ = ("waiting", "in_flight", "completed", "errors", "rejected",
+                 "total_wait", "total_run", "max_wait")
+
+    def __init__(self):
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.errors = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+        self.max_wait = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        done = self.completed + self.errors
+        return {
+            "queue_depth": self.waiting,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait / done * 1000, 3) if done else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+            "avg_run_ms": round(self.total_run / done * 1000, 3) if done else 0.0,
+        }
+
+
+class InferencePool:
+    """
+    Menjalankan fungsi blocking (normalisasi, predict, logging) di thread pool
+    dengan semaphore per model, sehingga event loop tetap menerima koneksi
+    dan satu model yang sibuk tidak menghabiskan semua worker.
+    """
+
+    def __init__(self, workers: int = INFERENCE_WORKERS, per_model: int = MODEL_CONCURRENCY,
+                 max_queue: int = MODEL_MAX_QUEUE):
+        self.workers = max(1, workers)
+        self.per_model = max(1, per_model)
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, ModelStats] = {}
+        self._lock = threading.Lock()
+        self._running = 0   # tugas yang sedang dieksekusi thread worker
+
+    def _stats_for(self, model_name: str) -> ModelStats:
+        stats = self._stats.get(model_name)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(model_name, ModelStats())
+        return stats
+
+    def _call(self, fn: Callable, args) -> Any:
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    async def run(self, model_name: str, fn: Callable, *args) -> Any:
+        stats = self._stats_for(model_name)
+        if self.max_queue and stats.waiting >= self.max_queue:
+            stats.rejected += 1
+            raise QueueFullError(f"Antrean model '{model_name}' penuh ({stats.waiting}).")
+
+        semaphore = self._semaphores.get(model_name)
+        if semaphore is None:
+            semaphore = self._semaphores.setdefault(model_name, asyncio.Semaphore(self.per_model))
+
+        queued_at = time.perf_counter()
+        stats.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            stats.waiting -= 1
+        started = time.perf_counter()
+        wait = started - queued_at
+        stats.total_wait += wait
+        stats.max_wait = max(stats.max_wait, wait)
+        stats.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, self._call, fn, args)
+            stats.completed += 1
+            return result
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+            stats.total_run += time.perf_counter() - started
+            semaphore.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        # in_flight = pemegang semaphore (sudah diserahkan ke executor); yang belum
+        # dieksekusi worker adalah antrean executor. Perkiraan: tugas yang baru selesai
+        # masih terhitung in_flight sampai event loop melanjutkannya.
+        in_flight = sum(stats.in_flight for stats in self._stats.values())
+        return {
+            "workers": self.workers,
+            "per_model_limit": self.per_model,
+            "max_queue": self.max_queue,
+            "executor_running": self._running,
+            "executor_backlog": max(0, in_flight - self._running),
+            "models": {name: stats.as_dict() for name, stats in sorted(self._stats.items())},
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+_POOL: Optional[InferencePool] = None
+
+
+def start_inference_pool() -> InferencePool:
+    global _POOL
+    if _POOL is None:
+        _POOL = InferencePool()
+    return _POOL
+
+
+def stop_inference_pool():
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown()
+        _POOL = None
+
+
+def get_inference_pool() -> InferencePool:
+    """Pool global (dibuat otomatis jika lifespan belum menyalakannya)."""
+    return _POOL if _POOL is not None else start_inference_pool()
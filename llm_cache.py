@@ -0,0 +1,137 @@
+# cache respons LLM di disk (LRU + TTL)
+
+# llm_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/llm_cache.sqlite3")
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 5000))
+CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+
+# Bucketing opsional agar prediksi yang "cukup mirip" berbagi jawaban:
+# - LLM_CACHE_PROB_BUCKET=0.05 → probabilitas dibulatkan ke kelipatan 0.05
+# - LLM_CACHE_NUMERIC_DIGITS=2 → input numerik dibulatkan ke 2 angka penting
+# Nilai 0 berarti tanpa bucketing (key persis).
+PROB_BUCKET = float(os.getenv("LLM_CACHE_PROB_BUCKET", 0))
+NUMERIC_DIGITS = int(os.getenv("LLM_CACHE_NUMERIC_DIGITS", 0))
+
+
+def _bucket_probability(value: float, step: float) -> float:
+    if not step:
+        return value
+    return round(round(value / step) * step, 10)
+
+
+def _bucket_numeric(value: Any, digits: int) -> Any:
+    if not digits or isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value
+    return float(f"{value:.{digits}g}")
+
+
+def recommendation_cache_key(model_name: str, prediction: Any, probabilities: Optional[Dict],
+                             sorted_labels: List[str], inputs: Optional[Dict],
+                             prob_bucket: float = None, numeric_digits: int = None) -> str:
+    """
+    Key cache kanonik (sha256) untuk input build_prompt_for_recommendation.
+    Urutan key dict tidak berpengaruh; bucketing mengikuti konfigurasi di atas.
+    """
+    prob_bucket = PROB_BUCKET if prob_bucket is None else prob_bucket
+    numeric_digits = NUMERIC_DIGITS if numeric_digits is None else numeric_digits
+    canonical = {
+        "model": model_name,
+        "prediction": prediction,
+        "probabilities": {k: _bucket_probability(v, prob_bucket) for k, v in (probabilities or {}).items()},
+        "sorted_labels": list(sorted_labels or []),
+        "inputs": {k: _bucket_numeric(v, numeric_digits) for k, v in (inputs or {}).items()},
+    }
+    raw = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Cache key → nilai JSON di SQLite lokal.
+    - entry lebih tua dari ttl_seconds dianggap kedaluwarsa
+    - jika jumlah entry melewati max_entries, entry yang paling lama
+      tidak diakses dibuang (LRU)
+    Aman dipakai dari beberapa thread (satu koneksi + lock) dan beberapa proses (SQLite).
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = CACHE_MAX_ENTRIES,
+                 ttl_seconds: int = CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed_at)")
+
+    def get(self, key: str) -> Any:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            with self._conn:
+                if now - created_at > self.ttl_seconds:
+                    self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    return None
+                self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        excess = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+_CACHE: Optional[ResponseCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Cache global (dibuat saat pertama dipakai); None jika LLM_CACHE=0."""
+    global _CACHE
+    if not CACHE_ENABLED:
+        return None
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = ResponseCache()
+    return _CACHE
@@ -1,52 +1,121 @@
 # main.py
 import uuid
 import json
-from storage import load_json, save_json
-from processor import prepare_recommendation_payload
-from ai_recommender import generate_recommendations_with_gemini, revise_recommendations_with_gemini
+from collections import Counter
+from itertools import tee
+from storage import (
+    RECS_DB_PATH,
+    get_recommendation,
+    query_recommendations,
+    insert_recommendation,
+    update_recommendation,
+    recommendation_source_hashes,
+    count_recommendations,
+    clear_recommendations,
+    ConcurrentUpdateError
+)
+from prediction_log import LOG_PATH, iter_predictions
+from processor import prepare_recommendation_payload, prediction_fingerprint
+from ai_recommender import (
+    GEMINI_CONCURRENCY,
+    generate_recommendations_with_gemini,
+    generate_recommendations_concurrently,
+    is_error_output,
+    revise_recommendations_with_gemini
+)
 from review_manager import add_review, list_pending_for_role
 from email_generator import create_email_summary
 
-INPUT_PATH = "SaveJson/prediction_log.json"       # input asli
-RECS_PATH = "SaveJson/recommendation_output.json" # output rekomendasi
+INPUT_PATH = LOG_PATH                             # log prediksi aktif (input asli)
+RECS_PATH = RECS_DB_PATH                          # store rekomendasi (SQLite)
 
 
 def load_input():
-    return load_json(INPUT_PATH, [])
+    # generator: record prediksi dibaca satu per satu dari log (semua format & segmen)
+    return iter_predictions()
 
-def save_recommendations(recs):
-    save_json(RECS_PATH, recs)
+def build_recommendation_record(rec, ai_out=None):
+    """
+    Membentuk record rekomendasi untuk satu record prediksi.
+    Jika ai_out belum ada, AI recommender dipanggil langsung.
+    """
+    model_name, prediction, probabilities, sorted_labels, inputs = prepare_recommendation_payload(rec)
+    if ai_out is None:
+        ai_out = generate_recommendations_with_gemini(model_name, prediction, probabilities, sorted_labels, inputs)
+    return {
+        "id": str(uuid.uuid4()),
+        "timestamp": rec.get("Timestamp"),
+        "model": model_name,
+        "prediction": prediction,
+        "probabilities": probabilities,
+        "sorted_labels": sorted_labels,
+        "inputs": inputs,
+        "recommendations": ai_out,
+        "status": "pending_review_mine_planner",
+        "assigned_reviewers": ["mine_planner", "shipping_planner"],
+        "version": 1,
+        "review_history": []
+    }
 
-def generate_all_recommendations():
-    records = load_input()
-    results = []
+def _iter_pending(records, processed=None):
+    """Melewati prediksi yang sudah punya rekomendasi; menghasilkan (record, source_hash)"""
+    processed = Counter(processed or {})
     for rec in records:
-        rec_id = str(uuid.uuid4())
-        model_name, prediction, probabilities, sorted_labels, inputs = prepare_recommendation_payload(rec)
-        ai_out = generate_recommendations_with_gemini(model_name, prediction, probabilities, sorted_labels, inputs)
-        new_rec = {
-            "id": rec_id,
-            "timestamp": rec.get("Timestamp"),
-            "model": model_name,
-            "prediction": prediction,
-            "probabilities": probabilities,
-            "sorted_labels": sorted_labels,
-            "inputs": inputs,
-            "recommendations": ai_out,
-            "status": "pending_review_mine_planner",
-            "assigned_reviewers": ["mine_planner", "shipping_planner"],
-            "version": 1,
-            "review_history": []
-        }
-        results.append(new_rec)
-    save_recommendations(results)
-    print(f"Generated {len(results)} recommendation records → saved to {RECS_PATH}")
+        source_hash = prediction_fingerprint(rec)
+        if processed[source_hash] > 0:
+            processed[source_hash] -= 1
+            continue
+        yield rec, source_hash
+
+def iter_recommendations(records, processed=None, concurrency=GEMINI_CONCURRENCY, llm_client=None):
+    """
+    Generator: menghasilkan record rekomendasi satu per satu (urutan sesuai input).
+    processed berisi Counter source_hash → jumlah prediksi yang sudah punya rekomendasi;
+    prediksi tersebut dilewati (prediksi identik dihitung per kemunculan).
+    Pemanggilan Gemini berjalan paralel sebanyak `concurrency` dengan rate limit.
+    """
+    pending_for_ai, pending = tee(_iter_pending(records, processed))
+    payloads = (prepare_recommendation_payload(rec) for rec, _ in pending_for_ai)
+    results = generate_recommendations_concurrently(payloads, concurrency=concurrency, llm_client=llm_client)
+    for (rec, source_hash), (_, ai_out) in zip(pending, results):
+        new_rec = build_recommendation_record(rec, ai_out)
+        new_rec["source_hash"] = source_hash
+        yield new_rec
+
+def generate_all_recommendations(incremental=True, concurrency=GEMINI_CONCURRENCY, llm_client=None):
+    """
+    Membuat rekomendasi dari log prediksi.
+    incremental=True  → hanya prediksi baru yang dikirim ke AI; hasilnya ditambahkan ke
+                        store (status, version, review_history record lama dipertahankan).
+    incremental=False → semua rekomendasi lama dihapus lalu semua prediksi diproses ulang.
+    concurrency       → jumlah panggilan Gemini paralel (GEMINI_CONCURRENCY di .env).
+    llm_client        → pengganti client Gemini (mis. fake client untuk pengujian lokal).
+    Setiap record yang selesai langsung disimpan, sehingga crash di tengah jalan tidak
+    menghilangkan hasil; run berikutnya melanjutkan dari prediksi yang belum diproses.
+    Hasil gagal (Gemini tetap error setelah retry) tidak disimpan: prediksinya dicoba
+    lagi pada run berikutnya.
+    """
+    if not incremental:
+        clear_recommendations()
+
+    processed = recommendation_source_hashes()
+    new_count = failed = 0
+    for new_rec in iter_recommendations(load_input(), processed, concurrency, llm_client):
+        if is_error_output(new_rec["recommendations"]):
+            failed += 1
+            print(f"[gagal] {new_rec['model']} → {new_rec['recommendations']['error']}")
+            continue
+        insert_recommendation(new_rec)
+        new_count += 1
+        print(f"[{new_count}] {new_rec['model']} → {new_rec['prediction']}")
+
+    print(f"Generated {new_count} new recommendation records ({count_recommendations()} total) → saved to {RECS_DB_PATH}")
+    if failed:
+        print(f"{failed} prediksi gagal diproses dan akan dicoba lagi pada run berikutnya.")
 
 def list_recommendations(filter_status=None):
-    recs = load_json(RECS_PATH, [])
+    recs = query_recommendations(status=filter_status or None)
     for r in recs:
-        if filter_status and r.get("status") != filter_status:
-            continue
         print("ID:", r.get("id"))
         print("Model:", r.get("model"))
         print("Prediction:", r.get("prediction"))
@@ -60,41 +129,44 @@ def interactive_review():
     name = input("Nama reviewer: ").strip()
     action = input("Action (approve/reject/request_changes): ").strip()
     comments = input("Komentar: ").strip()
-    review = add_review(rec_id, role, name, action, comments)
+    try:
+        review = add_review(rec_id, role, name, action, comments)
+    except ConcurrentUpdateError as e:
+        print(f"Review dibatalkan: {e} Silakan ulangi.")
+        return
     print("Review recorded:", review)
 
 def request_revision_by_ai():
     rec_id = input("Masukkan Recommendation ID yang perlu direvisi: ").strip()
     comments = input("Masukkan instruksi / komentar dari reviewer (alasan revisi): ").strip()
-    recs = load_json(RECS_PATH, [])
-    target = None
-    for r in recs:
-        if r.get("id") == rec_id:
-            target = r
-            break
+    target = get_recommendation(rec_id)
     if not target:
         print("Recommendation ID tidak ditemukan.")
         return
     # panggil Gemini revise
     original_payload = target.get("recommendations", {})
+    expected_version = target.get("version", 1)
     revised = revise_recommendations_with_gemini(original_payload, comments)
-    # update record
+    # update record (gagal jika record diubah reviewer lain selama revisi berjalan)
     target["recommendations"] = revised
     target["status"] = "pending_review_mine_planner"  # kembali ke mine planner
-    target["version"] = target.get("version", 1) + 1
-    save_json(RECS_PATH, recs)
+    target["version"] = expected_version + 1
+    try:
+        update_recommendation(target, expected_version=expected_version)
+    except ConcurrentUpdateError as e:
+        print(f"Revisi dibatalkan: {e} Silakan ulangi.")
+        return
     print("Revisi selesai, record diupdate dan dikembalikan ke mine_planner.")
 
 def generate_email():
     rec_id = input("Masukkan Recommendation ID untuk generate email: ").strip()
-    recs = load_json(RECS_PATH, [])
-    for r in recs:
-        if r.get("id") == rec_id:
-            email = create_email_summary(r)
-            print("Subject:", email.get("subject"))
-            print("Body:\n", email.get("body"))
-            return
-    print("ID tidak ditemukan.")
+    r = get_recommendation(rec_id)
+    if r is None:
+        print("ID tidak ditemukan.")
+        return
+    email = create_email_summary(r)
+    print("Subject:", email.get("subject"))
+    print("Body:\n", email.get("body"))
 
 def list_pending_for(role):
     items = list_pending_for_role(role)
@@ -107,13 +179,14 @@ def list_pending_for(role):
 def main_menu():
     while True:
         print("\n=== Agentic AI CLI ===")
-        print("1. Generate semua rekomendasi dari data/input.json")
+        print("1. Generate rekomendasi untuk prediksi baru (incremental)")
         print("2. List semua rekomendasi")
         print("3. List rekomendasi by status")
         print("4. Review (manual) - add review")
         print("5. List pending untuk role")
         print("6. Request AI revision (dengan komentar reviewer)")
         print("7. Generate email summary untuk sebuah recommendation")
+        print("8. Generate ulang SEMUA rekomendasi (hasil & status review lama diganti)")
         print("0. Exit")
         c = input("Pilih: ").strip()
         if c == "1":
@@ -132,6 +205,8 @@ def main_menu():
             request_revision_by_ai()
         elif c == "7":
             generate_email()
+        elif c == "8":
+            generate_all_recommendations(incremental=False)
         elif c == "0":
             break
         else:
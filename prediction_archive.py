@@ -0,0 +1,180 @@
+# kompaksi log prediksi ke arsip kolumnar (Parquet) per model & tanggal untuk analitik
+
+# prediction_archive.py
+import argparse
+import glob
+import os
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from prediction_log import (
+    JSONL_LOG_PATH, LEGACY_LOG_PATH, MSGPACK_LOG_PATH,
+    iter_log_file, list_log_segments, rotate_log,
+)
+from prediction_utils import CATEGORICAL_MAP, models_config
+from storage import load_json, save_json
+
+try:
+    import pyarrow  # noqa: F401  (engine Parquet untuk pandas)
+except ImportError:
+    pyarrow = None
+
+# Layout: SaveJson/archive/model=<nama>/date=<YYYY-MM-DD>/part-<segmen>.parquet
+ARCHIVE_DIR = os.getenv("PREDICTION_ARCHIVE_DIR", "SaveJson/archive")
+STATE_PATH = os.path.join(ARCHIVE_DIR, "_state.json")   # segmen yang sudah diarsipkan
+
+META_COLUMNS = ["timestamp", "prediction"]
+PROBA_PREFIX = "proba_"
+
+_FEATURES = {cfg["name"]: cfg["features"] for cfg in models_config}
+
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise RuntimeError("Arsip Parquet membutuhkan paket 'pyarrow'.")
+
+
+def _signature(path: str) -> List[int]:
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _partition_dir(model: str, day: str) -> str:
+    return os.path.join(ARCHIVE_DIR, f"model={model}", f"date={day}")
+
+
+def _iter_legacy(path: str) -> Iterable[Dict]:
+    data = load_json(path, [])
+    return data if isinstance(data, list) else [data]
+
+
+def _pending_sources(state: Dict, include_legacy: bool) -> List[str]:
+    """Sumber yang belum diarsipkan: log lama + segmen hasil rotasi (file aktif dilewati)."""
+    active = {JSONL_LOG_PATH, MSGPACK_LOG_PATH}
+    sources = [LEGACY_LOG_PATH] if include_legacy and os.path.exists(LEGACY_LOG_PATH) else []
+    sources += [seg for seg in list_log_segments() if seg not in active]
+    return [src for src in sources if state.get(os.path.basename(src)) != _signature(src)]
+
+
+def records_to_frame(model: str, records: List[Dict]) -> pd.DataFrame:
+    """
+    Mengubah record log satu model menjadi DataFrame kolumnar:
+    timestamp, prediction, proba_<label>..., lalu satu kolom per fitur models_config.
+    """
+    features = _FEATURES.get(model) or sorted({k for r in records for k in (r.get("Inputs") or {})})
+    labels = sorted({label for r in records for label in (r.get("Probabilities") or {})})
+
+    columns = {
+        "timestamp": pd.to_datetime([r.get("Timestamp") for r in records], errors="coerce"),
+        "prediction": pd.Series([r.get("Prediction") for r in records], dtype="string"),
+    }
+    for label in labels:
+        columns[PROBA_PREFIX + label] = pd.Series(
+            [(r.get("Probabilities") or {}).get(label) for r in records], dtype="float64"
+        )
+    for feat in features:
+        raw = pd.Series([(r.get("Inputs") or {}).get(feat) for r in records], dtype="object")
+        numeric = pd.to_numeric(raw, errors="coerce")
+        # kolom kategorikal (atau yang berisi teks) disimpan sebagai string, sisanya float
+        if feat in CATEGORICAL_MAP or numeric.isna().sum() > raw.isna().sum():
+            columns[feat] = raw.astype("string")
+        else:
+            columns[feat] = numeric.astype("float64")
+    return pd.DataFrame(columns)
+
+
+def compact_predictions(rotate_active: bool = False, include_legacy: bool = True) -> Dict[str, int]:
+    """
+    Mengarsipkan segmen log yang belum diarsipkan ke Parquet (per model & tanggal).
+    Segmen yang sama menghasilkan nama part yang sama, sehingga job aman diulang.
+    rotate_active=True merotasi log aktif dulu agar record terbaru ikut diarsipkan.
+    Mengembalikan jumlah baris yang ditulis per model.
+    """
+    _require_pyarrow()
+    if rotate_active:
+        for path in (JSONL_LOG_PATH, MSGPACK_LOG_PATH):
+            if os.path.exists(path):
+                rotate_log(path)
+
+    state = load_json(STATE_PATH, {}, mutable=True)
+    written = defaultdict(int)
+    for source in _pending_sources(state, include_legacy):
+        records = _iter_legacy(source) if source == LEGACY_LOG_PATH else iter_log_file(source)
+        groups = defaultdict(list)
+        for rec in records:
+            day = str(rec.get("Timestamp") or "")[:10] or "unknown"
+            groups[(rec.get("Model") or "unknown", day)].append(rec)
+
+        part = "part-" + os.path.splitext(os.path.basename(source))[0] + ".parquet"
+        for (model, day), group in groups.items():
+            target_dir = _partition_dir(model, day)
+            os.makedirs(target_dir, exist_ok=True)
+            records_to_frame(model, group).to_parquet(os.path.join(target_dir, part), index=False)
+            written[model] += len(group)
+
+        state[os.path.basename(source)] = _signature(source)
+        save_json(STATE_PATH, state)
+    return dict(written)
+
+
+def _as_day(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
+
+
+def load_archive(model: str, since=None, until=None, columns: List[str] = None) -> pd.DataFrame:
+    """
+    Membaca arsip satu model sebagai DataFrame. since/until (tanggal atau string
+    'YYYY-MM-DD[ HH:MM:SS]') memangkas partisi sebelum file dibaca.
+    """
+    _require_pyarrow()
+    first, last = _as_day(since), _as_day(until)
+    wanted = None
+    if columns is not None:
+        wanted = list(dict.fromkeys(["timestamp", *columns]))
+
+    frames = []
+    for part_dir in sorted(glob.glob(os.path.join(glob.escape(ARCHIVE_DIR), f"model={model}", "date=*"))):
+        day = part_dir.rsplit("date=", 1)[-1]
+        if (first and day < first) or (last and day > last):
+            continue
+        for part in sorted(glob.glob(os.path.join(part_dir, "*.parquet"))):
+            frames.append(pd.read_parquet(part, columns=wanted))
+
+    if not frames:
+        return pd.DataFrame(columns=wanted or META_COLUMNS + _FEATURES.get(model, []))
+    df = pd.concat(frames, ignore_index=True)
+    if since is not None:
+        df = df[df["timestamp"] >= pd.Timestamp(since)]
+    if until is not None:
+        until_ts = pd.Timestamp(until)
+        date_only = (isinstance(until, date) and not isinstance(until, datetime)) or \
+            (isinstance(until, str) and len(until) <= 10)
+        if date_only:
+            until_ts += pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)   # sampai akhir hari
+        df = df[df["timestamp"] <= until_ts]
+    df = df.sort_values("timestamp", kind="stable").reset_index(drop=True)
+    return df if columns is None else df[columns]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kompaksi log prediksi ke arsip Parquet.")
+    parser.add_argument("--rotate", action="store_true", help="rotasi log aktif sebelum kompaksi")
+    parser.add_argument("--skip-legacy", action="store_true", help="lewati prediction_log.json lama")
+    args = parser.parse_args(argv)
+
+    written = compact_predictions(rotate_active=args.rotate, include_legacy=not args.skip_legacy)
+    if not written:
+        print("Tidak ada segmen baru untuk diarsipkan.")
+    for model, count in sorted(written.items()):
+        print(f"{model}: {count} baris → {ARCHIVE_DIR}/model={model}/")
+
+
+if __name__ == "__main__":
+    main()
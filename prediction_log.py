@@ -0,0 +1,466 @@
+# log prediksi append-only (JSON Lines / msgpack) + rotasi & pembaca streaming
+
+# prediction_log.py
+import atexit
+import glob
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from storage import file_lock, iter_jsonl
+
+try:
+    import ormsgpack as _msgpack
+except ImportError:
+    try:
+        import msgpack as _msgpack
+    except ImportError:
+        _msgpack = None
+
+# Format log aktif: "jsonl" (JSON compact per baris, default) atau "msgpack"
+# (biner, lebih kecil & cepat di-parse; butuh paket ormsgpack/msgpack).
+LOG_FORMAT = os.getenv("PREDICTION_LOG_FORMAT", "jsonl")
+
+JSONL_LOG_PATH = "SaveJson/prediction_log.jsonl"      # 1 record JSON per baris
+MSGPACK_LOG_PATH = "SaveJson/prediction_log.msgpack"  # frame: panjang (4 byte) + msgpack
+LOG_PATH = MSGPACK_LOG_PATH if LOG_FORMAT == "msgpack" else JSONL_LOG_PATH   # log aktif
+LEGACY_LOG_PATH = "SaveJson/prediction_log.json"      # format lama (JSON array)
+
+# Rotasi: file aktif dipindah ke prediction_log-<waktu>.jsonl jika ukurannya
+# melewati batas atau jika record terakhirnya ditulis di hari yang berbeda.
+MAX_LOG_BYTES = int(os.getenv("PREDICTION_LOG_MAX_BYTES", 50 * 1024 * 1024))
+ROTATE_DAILY = os.getenv("PREDICTION_LOG_ROTATE_DAILY", "1") != "0"
+FSYNC = os.getenv("PREDICTION_LOG_FSYNC", "0") == "1"
+
+
+def _rotated_path(path: str, when: datetime) -> str:
+    base, ext = os.path.splitext(path)
+    return f"{base}-{when.strftime('%Y%m%d-%H%M%S-%f')}{ext}"
+
+
+def _should_rotate(path: str, incoming_bytes: int) -> bool:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return False
+    if st.st_size == 0:
+        return False
+    if st.st_size + incoming_bytes > MAX_LOG_BYTES:
+        return True
+    if ROTATE_DAILY:
+        last_write = datetime.fromtimestamp(st.st_mtime).date()
+        return last_write != datetime.now().date()
+    return False
+
+
+def rotate_log(path: str = LOG_PATH):
+    """Memaksa rotasi file log aktif. Mengembalikan path hasil rotasi (atau None)."""
+    with file_lock(path):
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return None
+        target = _rotated_path(path, datetime.now())
+        os.replace(path, target)
+        return target
+
+
+def _is_msgpack(path: str) -> bool:
+    return path.endswith(".msgpack")
+
+
+def _require_msgpack():
+    if _msgpack is None:
+        raise RuntimeError("Format log msgpack membutuhkan paket 'ormsgpack' atau 'msgpack'.")
+    return _msgpack
+
+
+def encode_records(entries: Iterable[Dict], path: str = LOG_PATH) -> bytes:
+    """Serialisasi record sesuai format file tujuan (JSON Lines atau frame msgpack)."""
+    if _is_msgpack(path):
+        packb = _require_msgpack().packb
+        frames = []
+        for entry in entries:
+            body = packb(entry)
+            frames.append(struct.pack(">I", len(body)))
+            frames.append(body)
+        return b"".join(frames)
+    return "".join(
+        json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        for entry in entries
+    ).encode("utf-8")
+
+
+def _iter_msgpack_frames(path: str, offset: int = 0) -> Iterator[Tuple[int, int, Dict]]:
+    """
+    (awal, akhir, record) untuk setiap frame utuh mulai dari byte `offset`.
+    Frame terakhir yang terpotong (sedang/gagal ditulis) diabaikan; frame rusak
+    menghentikan pembacaan segmen dengan peringatan (frame setelahnya tidak lagi sejajar).
+    """
+    unpackb = _require_msgpack().unpackb
+    with open(path, "rb") as f:
+        file_size = os.fstat(f.fileno()).st_size
+        f.seek(offset)
+        while True:
+            header = f.read(4)
+            if len(header) < 4:
+                return
+            (size,) = struct.unpack(">I", header)
+            end = offset + 4 + size
+            if end > file_size:
+                return  # frame terakhir terpotong
+            body = f.read(size)
+            try:
+                record = unpackb(body)
+            except Exception as e:
+                record, error = None, e
+            else:
+                error = None if isinstance(record, dict) else f"bukan record ({type(record).__name__})"
+            if error is not None:
+                print(f"Peringatan: frame rusak di {path} (byte {offset}), sisa segmen dilewati: {error}")
+                return
+            yield offset, end, record
+            offset = end
+
+
+def _iter_msgpack(path: str) -> Iterator[Dict]:
+    for _, _, record in _iter_msgpack_frames(path):
+        yield record
+
+
+# path → (inode, offset) batas frame utuh yang sudah diperiksa oleh proses ini
+_CHECKED_FRAMES: Dict[str, Tuple[int, int]] = {}
+
+
+def _truncate_torn_frame(path: str):
+    """
+    Dipanggil di dalam file lock sebelum append msgpack: frame terakhir yang terpotong
+    (penulis crash di tengah write) dibuang agar frame baru tidak ditulis di belakangnya
+    dan membuat semua frame berikutnya tidak terbaca. Hanya header frame sejak
+    pemeriksaan terakhir proses ini yang dibaca.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        _CHECKED_FRAMES.pop(path, None)
+        return
+    ino, offset = _CHECKED_FRAMES.get(path, (None, 0))
+    if ino != st.st_ino or offset > st.st_size:
+        offset = 0
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        while offset + 4 <= st.st_size:
+            (size,) = struct.unpack(">I", f.read(4))
+            if offset + 4 + size > st.st_size:
+                break
+            offset += 4 + size
+            f.seek(offset)
+        if offset < st.st_size:
+            print(f"Peringatan: {st.st_size - offset} byte frame terpotong di akhir {path} dibuang.")
+            f.truncate(offset)
+    _CHECKED_FRAMES[path] = (st.st_ino, offset)
+
+
+def iter_log_file(path: str) -> Iterator[Dict]:
+    """Membaca satu file log (format dideteksi dari ekstensi)."""
+    if _is_msgpack(path):
+        return _iter_msgpack(path)
+    return iter_jsonl(path)
+
+
+def _iter_jsonl_lines(path: str, offset: int = 0) -> Iterator[Tuple[int, int, Optional[Dict]]]:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                return  # baris terakhir belum selesai ditulis
+            start, offset = offset, offset + len(line)
+            try:
+                record = json.loads(line) if line.strip() else None
+            except ValueError:
+                record = None   # baris rusak dilewati (seperti iter_jsonl)
+            yield start, offset, record
+
+
+def iter_log_records(path: str, offset: int = 0) -> Iterator[Tuple[int, int, Optional[Dict]]]:
+    """
+    (awal, akhir, record) untuk record utuh mulai dari byte `offset`, untuk pembaca
+    inkremental. record None = baris rusak yang dilewati (offset tetap maju).
+    """
+    if _is_msgpack(path):
+        return _iter_msgpack_frames(path, offset)
+    return _iter_jsonl_lines(path, offset)
+
+
+# ============================================================
+# Posisi baca per file (pembaca inkremental: ringkasan, indeks chat)
+# ============================================================
+
+# Byte awal file yang disimpan untuk mendeteksi file lain yang memakai inode yang sama
+_HEAD_BYTES = 64
+
+
+def _file_head(path: str, n: int) -> str:
+    with open(path, "rb") as f:
+        return f.read(n).hex()
+
+
+def sync_log_cursors(cursors: Dict[str, Dict], paths: Iterable[str]) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """
+    Mencocokkan posisi baca tersimpan dengan file log saat ini. File dikenali dari
+    inode, bukan nama, sehingga rotasi (rename) tidak membuat isinya dibaca ulang.
+    cursors: kunci file → {"offset", "head"}; diperbarui in-place.
+    Mengembalikan (kunci file yang hilang/isinya diganti, [(kunci, path)] yang punya data baru);
+    cursor file yang diganti dimulai lagi dari awal.
+    """
+    live = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        live[f"{st.st_dev}:{st.st_ino}"] = (path, st.st_size)
+
+    dropped = [key for key in cursors if key not in live]
+    for key in dropped:
+        del cursors[key]
+
+    pending = []
+    for key, (path, size) in live.items():
+        cursor = cursors.get(key)
+        if cursor is not None and size != cursor["offset"]:
+            head = cursor.get("head", "")
+            if size < cursor["offset"] or _file_head(path, len(head) // 2) != head:
+                dropped.append(key)   # file dipotong atau inode dipakai file lain
+                cursor = None
+        if cursor is None:
+            cursor = cursors[key] = {"offset": 0, "head": ""}
+        if size > cursor["offset"]:
+            pending.append((key, path))
+    return dropped, pending
+
+
+def read_from_cursor(cursor: Dict, path: str) -> Iterator[Tuple[int, Dict]]:
+    """(offset awal, record) baru sejak cursor; cursor maju sampai record utuh terakhir."""
+    for start, end, record in iter_log_records(path, cursor["offset"]):
+        cursor["offset"] = end
+        if record is not None:
+            yield start, record
+    if len(cursor.get("head", "")) < 2 * _HEAD_BYTES:
+        cursor["head"] = _file_head(path, min(_HEAD_BYTES, cursor["offset"]))
+
+
+def append_predictions(entries: Iterable[Dict], path: str = LOG_PATH, fsync: bool = FSYNC):
+    """
+    Menambahkan record prediksi ke log (compact, satu record per baris/frame).
+    Penulisan dilindungi file lock sehingga aman untuk beberapa worker uvicorn.
+    """
+    entries = list(entries)
+    payload = encode_records(entries, path)
+    if not payload:
+        return
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with file_lock(path):
+        if _should_rotate(path, len(payload)):
+            os.replace(path, _rotated_path(path, datetime.now()))
+        if _is_msgpack(path):
+            _truncate_torn_frame(path)
+        with open(path, "ab") as f:
+            f.write(payload)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+            end = f.tell()
+        if _is_msgpack(path):
+            _CHECKED_FRAMES[path] = (os.stat(path).st_ino, end)
+
+
+
+def list_log_segments(path: str = None) -> List[str]:
+    """
+    Daftar file log berurutan dari yang terlama: hasil rotasi lalu file aktif.
+    Tanpa path, segmen semua format (jsonl & msgpack) digabung berdasarkan waktu rotasi.
+    """
+    paths = [path] if path else [JSONL_LOG_PATH, MSGPACK_LOG_PATH]
+    rotated, active = [], []
+    for p in paths:
+        base, ext = os.path.splitext(p)
+        for segment in glob.glob(f"{glob.escape(base)}-*{ext}"):
+            stamp = segment[len(base) + 1:-len(ext)]
+            rotated.append((stamp, segment))
+        if os.path.exists(p):
+            active.append((os.path.getmtime(p), p))
+    return [seg for _, seg in sorted(rotated)] + [p for _, p in sorted(active)]
+
+
+def iter_predictions(path: str = None, legacy_path: str = LEGACY_LOG_PATH) -> Iterator[Dict]:
+    """
+    Membaca semua record prediksi secara streaming (tanpa memuat semuanya).
+    Urutan: log lama (JSON array) jika ada, segmen hasil rotasi, lalu log aktif.
+    """
+    if legacy_path and os.path.exists(legacy_path):
+        try:
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                legacy = json.load(f)
+            if not isinstance(legacy, list):
+                legacy = [legacy]
+            yield from legacy
+        except json.JSONDecodeError:
+            pass
+
+    for segment in list_log_segments(path):
+        yield from iter_log_file(segment)
+
+
+# ============================================================
+# Sink asinkron: penulisan log di thread latar
+# ============================================================
+
+class PredictionLogSink:
+    """
+    Menampung record prediksi di queue berbatas lalu menuliskannya per batch
+    dari thread latar, sehingga request tidak menunggu I/O disk.
+    - flush setiap max_batch record atau setiap flush_interval_ms
+    - overflow="block": pemanggil menunggu ruang kosong (backpressure)
+      overflow="drop":  record dibuang dan dihitung di `dropped`
+    - close() selalu mengosongkan queue sebelum thread berhenti
+    """
+
+    _STOP = object()
+
+    def __init__(self, path: str = LOG_PATH, max_batch: int = 256, flush_interval_ms: int = 200,
+                 max_queue: int = 10000, overflow: str = "block"):
+        if overflow not in ("block", "drop"):
+            raise ValueError(f"overflow tidak dikenal: {overflow}")
+        self.path = path
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.overflow = overflow
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def pending(self) -> int:
+        """Perkiraan jumlah record yang masih menunggu ditulis."""
+        return self._queue.qsize()
+
+    def start(self):
+        if self.running:
+            return self
+        self._thread = threading.Thread(target=self._run, name="prediction-log-sink", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, entry: Dict) -> bool:
+        """Memasukkan record ke queue. False jika record dibuang (overflow="drop")."""
+        if self.overflow == "drop":
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                self.dropped += 1
+                return False
+        else:
+            self._queue.put(entry)
+        return True
+
+    def flush(self):
+        """Menunggu sampai semua record yang sudah di-submit tertulis ke disk."""
+        if self.running:
+            self._queue.join()
+
+    def close(self):
+        if not self.running:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _write(self, batch: List[Dict]):
+        try:
+            append_predictions(batch, self.path)
+            self.written += len(batch)
+        except Exception as e:
+            print(f"Gagal menulis {len(batch)} record ke {self.path}: {e}")
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is self._STOP:
+                self._queue.task_done()
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    self._queue.task_done()
+                    break
+                batch.append(item)
+
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+        # sisa record yang masuk setelah sinyal berhenti tetap ditulis
+        rest = []
+        while True:
+            try:
+                rest.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        rest = [item for item in rest if item is not self._STOP]
+        if rest:
+            self._write(rest)
+        for _ in range(len(rest)):
+            self._queue.task_done()
+
+
+_SINK: Optional[PredictionLogSink] = None
+
+
+def start_log_sink(path: str = LOG_PATH) -> PredictionLogSink:
+    """Menyalakan sink global (konfigurasi dari environment)."""
+    global _SINK
+    if _SINK is None or not _SINK.running:
+        _SINK = PredictionLogSink(
+            path=path,
+            max_batch=int(os.getenv("PREDICTION_LOG_BATCH", 256)),
+            flush_interval_ms=int(os.getenv("PREDICTION_LOG_FLUSH_MS", 200)),
+            max_queue=int(os.getenv("PREDICTION_LOG_QUEUE", 10000)),
+            overflow=os.getenv("PREDICTION_LOG_OVERFLOW", "block"),
+        ).start()
+    return _SINK
+
+
+def stop_log_sink():
+    """Flush dan hentikan sink global."""
+    global _SINK
+    if _SINK is not None:
+        _SINK.close()
+        _SINK = None
+
+
+def get_log_sink() -> Optional[PredictionLogSink]:
+    return _SINK if _SINK is not None and _SINK.running else None
+
+
+atexit.register(stop_log_sink)
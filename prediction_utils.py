@@ -1,10 +1,17 @@
 import os
-import joblib
-import pandas as pd
-import numpy as np
-import json
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from datetime import datetime
 
+# joblib/pandas/numpy di-import di dalam fungsi yang memakainya: daftar model
+# (models_config) dan CLI yang tidak memprediksi tidak membayar biaya import-nya.
+
+from prediction_log import LOG_PATH, append_predictions, get_log_sink
+from value_coercion import CATEGORICAL_FILL, NUMERIC_FILL, coerce_numeric, is_null, to_float
+
 
 # ============================================================
 # Konfigurasi Model
@@ -108,59 +115,574 @@ def load_model(path):
     if not os.path.exists(path):
         raise FileNotFoundError(f"File model tidak ditemukan: {path}")
 
+    import joblib
+
     model_data = joblib.load(path)
     if isinstance(model_data, dict) and "model" in model_data:
         return model_data["model"], model_data.get("feature_order")
     return model_data, None
 
 
+# ============================================================
+# Registry Model (cache in-process)
+# ============================================================
+
+# name -> {"model", "features", "file", "signature", "stats"}
+_MODEL_REGISTRY = {}
+_REGISTRY_LOCK = threading.Lock()
+# name -> Lock: model berbeda bisa dimuat bersamaan, model yang sama hanya sekali
+_MODEL_LOCKS = {}
+# name -> {"state": "loading" | "ready" | "failed", "error": pesan | None}
+_LOAD_STATUS = {}
+# False di worker prefork (serve.py): model di registry dipakai apa adanya tanpa stat
+# .pkl per request; pemuatan ulang hanya di proses induk (SIGHUP) agar tidak setiap
+# worker memuat salinan model sendiri
+RELOAD_ON_CHANGE = True
+# Jumlah thread pemuat saat warm-up; 0 = sebanyak core CPU (maks. satu per model)
+LOAD_WORKERS = int(os.getenv("MVCO_LOAD_WORKERS", 0))
+
+
+def get_model_config(model_name):
+    """Mengambil konfigurasi model berdasarkan nama (None jika tidak ada)"""
+    return next((cfg for cfg in models_config if cfg["name"] == model_name), None)
+
+
+def _file_signature(path):
+    """Signature file model (mtime + ukuran) untuk mendeteksi perubahan .pkl"""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _model_lock(model_name):
+    lock = _MODEL_LOCKS.get(model_name)
+    if lock is None:
+        with _REGISTRY_LOCK:
+            lock = _MODEL_LOCKS.setdefault(model_name, threading.Lock())
+    return lock
+
+
+def get_model(model_name):
+    """
+    Mengambil model dari registry in-process.
+    Model hanya di-load ulang (joblib.load) jika file .pkl berubah (mtime/ukuran)
+    dan RELOAD_ON_CHANGE aktif. Mengembalikan tuple (model, features).
+    """
+    cfg = get_model_config(model_name)
+    if cfg is None:
+        raise KeyError(f"Model '{model_name}' tidak ditemukan.")
+    if not RELOAD_ON_CHANGE:
+        entry = _MODEL_REGISTRY.get(model_name)
+        if entry is not None:
+            return entry["model"], entry["features"]
+
+    path = cfg["file"]
+    if not os.path.exists(path):
+        _LOAD_STATUS[model_name] = {"state": "failed", "error": f"File model tidak ditemukan: {path}"}
+        raise FileNotFoundError(f"File model tidak ditemukan: {path}")
+    signature = _file_signature(path)
+
+    entry = _MODEL_REGISTRY.get(model_name)
+    if entry is not None and entry["signature"] == signature:
+        return entry["model"], entry["features"]
+
+    with _model_lock(model_name):
+        # Cek ulang: thread lain mungkin sudah memuat model yang sama
+        entry = _MODEL_REGISTRY.get(model_name)
+        if entry is not None and entry["signature"] == signature:
+            return entry["model"], entry["features"]
+
+        if entry is None:
+            _LOAD_STATUS[model_name] = {"state": "loading", "error": None}
+        try:
+            entry = _load_entry(model_name, cfg, path, signature)
+        except Exception as e:
+            _LOAD_STATUS[model_name] = {"state": "failed", "error": str(e)}
+            raise
+        _MODEL_REGISTRY[model_name] = entry
+        _LOAD_STATUS[model_name] = {"state": "ready", "error": None}
+    return entry["model"], entry["features"]
+
+
+def rss_bytes():
+    """Resident memory proses saat ini (bytes), atau None jika tidak bisa diukur (psutil opsional)."""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # fallback terakhir: puncak RSS (KB di Linux, bytes di macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def _load_entry(model_name, cfg, path, signature):
+    """
+    Memuat model untuk registry. Hasil ekspor (forest_compiler) yang masih segar dipakai
+    langsung tanpa membaca .pkl; selain itu .pkl dimuat dan jalur cepatnya dikompilasi
+    saat prediksi pertama (get_fast_path), bukan di sini.
+    """
+    import numpy as np
+
+    started, cpu_started, rss_before = time.perf_counter(), time.thread_time(), rss_bytes()
+    compiled = None
+    if FAST_PATH_ENABLED:
+        from pipeline_compiler import load_exported_pipeline
+
+        try:
+            compiled = load_exported_pipeline(model_name, path)
+        except Exception as e:
+            # hasil ekspor rusak/tidak terbaca tidak boleh membuat model gagal dimuat
+            print(f"Hasil ekspor '{model_name}' tidak bisa dimuat ({e}); memakai {path}")
+    if compiled is not None:
+        model, features, source = compiled, compiled.features, "compiled"
+        forest = "mmap" if isinstance(compiled.estimator.value, np.memmap) else "memory"
+    else:
+        model, feat_order = load_model(path)
+        features, source, forest = feat_order or cfg["features"], "pickle", None
+        # skema kolom diturunkan sekali di sini, bukan di setiap prediksi
+        get_model_schema(model, features)
+    rss_after = rss_bytes()
+
+    entry = {
+        "model": model,
+        "features": features,
+        "file": path,
+        "signature": signature,
+        "stats": {
+            # load_ms: waktu dinding (termasuk menunggu GIL jika ada thread lain yang sibuk);
+            # load_cpu_ms: CPU yang dipakai thread pemuat saja, tidak terpengaruh kontensi
+            "load_ms": round((time.perf_counter() - started) * 1000, 1),
+            "load_cpu_ms": round((time.thread_time() - cpu_started) * 1000, 1),
+            "source": source,
+            # forest datar: "mmap" (hasil ekspor), "memory" (dikompilasi saat prediksi pertama)
+            "forest": forest,
+            # selisih RSS bersifat perkiraan jika model lain dimuat bersamaan
+            "rss_mb": None if rss_after is None else round(rss_after / 2**20, 1),
+            "rss_delta_mb": None if None in (rss_before, rss_after)
+                            else round((rss_after - rss_before) / 2**20, 1),
+        },
+    }
+    return entry
+
+
+def model_load_metrics():
+    """Metrik pemuatan per model di registry: waktu, sumber (compiled/pickle), forest, RSS"""
+    return {name: dict(entry["stats"]) for name, entry in sorted(_MODEL_REGISTRY.items())}
+
+
+def _preimport(names, compile_fast_path=False):
+    """
+    Import berat yang dibutuhkan pemuatan dilakukan sekali di thread pemanggil, agar tidak
+    ikut terhitung sebagai waktu muat model yang kebetulan pertama. joblib/pandas/sklearn
+    hanya di-import jika ada model yang harus dimuat dari .pkl (tanpa hasil ekspor segar,
+    atau compile_fast_path yang juga memuat forest sklearn untuk batch besar).
+    """
+    import pipeline_compiler
+    from forest_compiler import export_is_fresh
+
+    configs = [get_model_config(name) for name in names]
+    if FAST_PATH_ENABLED and not compile_fast_path \
+            and all(export_is_fresh(cfg["name"], cfg["file"]) for cfg in configs):
+        return
+    import joblib
+    import pandas
+    try:
+        import sklearn.ensemble
+        import sklearn.pipeline
+    except ImportError:
+        pass
+
+
+def _warm_up_one(model_name, compile_fast_path=False):
+    model, features = get_model(model_name)
+    get_normalizer(features)
+    if compile_fast_path:
+        fast = get_fast_path(model, features)
+        if fast is not None:
+            fast.load_batch_estimator()
+
+
+def warm_up_models(compile_fast_path=False):
+    """
+    Memuat semua model di models_config ke registry secara paralel (dipanggil saat startup).
+    compile_fast_path=True: jalur cepat model dari .pkl (tanpa hasil ekspor) langsung
+    dikompilasi dan forest sklearn untuk batch besar model dari hasil ekspor langsung dimuat,
+    bukan saat dipakai pertama (mis. di proses induk sebelum fork, agar dibagi semua worker).
+    Thread pemuat sebanyak LOAD_WORKERS (default jumlah core): baca file & salin buffer NumPy
+    melepas GIL sehingga beberapa .pkl bisa dimuat bersamaan, tetapi bagian unpickle objek
+    memegang GIL. Di mesin 1 core thread hanya saling berebut (6 model: 0,98 s dengan 6 thread
+    vs 0,71 s berurutan), jadi di sana model dimuat berurutan. Hasil ekspor (forest_compiler.py)
+    dimuat dalam hitungan milidetik per model. Model yang gagal dicatat (model_health) dan
+    dilewati agar model lain tetap bisa dipakai.
+    """
+    names = [cfg["name"] for cfg in models_config]
+    started = time.perf_counter()
+    previous = {name: _MODEL_REGISTRY.get(name) for name in names}
+    _preimport(names, compile_fast_path)
+
+    def load(name):
+        try:
+            _warm_up_one(name, compile_fast_path)
+            return True
+        except Exception as e:
+            print(f"Gagal memuat model '{name}': {e}")
+            return False
+
+    workers = max(1, min(len(names), LOAD_WORKERS or os.cpu_count() or 1))
+    if workers == 1:
+        ok = [load(name) for name in names]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="model-load") as pool:
+            ok = list(pool.map(load, names))
+    loaded = [name for name, success in zip(names, ok) if success]
+
+    metrics = model_load_metrics()
+    for name in loaded:
+        if previous[name] is not None and previous[name]["signature"] == _MODEL_REGISTRY[name]["signature"]:
+            continue   # sudah ada di registry dan tidak berubah
+        stats = metrics[name]
+        rss = "-" if stats["rss_mb"] is None else f"{stats['rss_mb']} MB ({stats['rss_delta_mb']:+} MB)"
+        print(f"[startup] {name}: {stats['load_ms']} ms (CPU {stats['load_cpu_ms']} ms), RSS {rss}, "
+              f"model {stats['source']}, forest {stats['forest'] or '-'}")
+    print(f"[startup] {len(loaded)}/{len(names)} model siap dalam "
+          f"{(time.perf_counter() - started) * 1000:.0f} ms")
+    return loaded
+
+
+def warm_up_in_background():
+    """
+    warm_up_models di thread latar: server langsung menerima koneksi dan setiap
+    model bisa dipakai begitu selesai dimuat (request ke model yang belum dimuat
+    memuatnya sendiri; request ke model yang sedang dimuat menunggu lock model itu saja).
+    """
+    thread = threading.Thread(target=warm_up_models, name="model-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def model_health():
+    """
+    Status kesiapan model: "ok" (semua siap), "degraded" (sebagian siap),
+    "starting" (belum ada yang siap, masih dimuat), "unavailable" (semua gagal).
+    """
+    models = {}
+    for cfg in models_config:
+        name = cfg["name"]
+        status = dict(_LOAD_STATUS.get(name) or {"state": "pending", "error": None})
+        entry = _MODEL_REGISTRY.get(name)
+        if entry is not None:
+            status["load_ms"] = entry["stats"]["load_ms"]
+            status["load_cpu_ms"] = entry["stats"]["load_cpu_ms"]
+        models[name] = status
+
+    states = [m["state"] for m in models.values()]
+    ready = states.count("ready")
+    if ready == len(states):
+        overall = "ok"
+    elif ready:
+        overall = "degraded"
+    elif states.count("failed") == len(states):
+        overall = "unavailable"
+    else:
+        overall = "starting"
+    return {"status": overall, "ready": ready, "total": len(states), "models": models}
+
+
+# ============================================================
+# Normalisasi Input (dikompilasi sekali per model)
+# ============================================================
+
+# feature -> {nilai lowercase: nilai kanonik}
+_CATEGORICAL_LOOKUP = {
+    feature: {v.lower(): v for v in values}
+    for feature, values in CATEGORICAL_MAP.items()
+}
+
+
+def _categorical_converter(feature_name):
+    lookup = _CATEGORICAL_LOOKUP[feature_name]
+
+    def convert(value):
+        if is_null(value):
+            return 0.0
+        value_str = str(value).strip().lower()
+        return lookup.get(value_str) or value_str.capitalize()
+
+    return convert
+
+
+_CONVERTERS = {feature: _categorical_converter(feature) for feature in CATEGORICAL_MAP}
+
+
+def _converter_for(feature_name):
+    return _CONVERTERS.get(feature_name, to_float)
+
+
 def normalize_input(value, feature_name=None):
     """Menormalkan input agar sesuai format model"""
-    if value in [None, "", "None", "none", "NaN", "nan", np.nan]:
-        return 0.0
+    return _converter_for(feature_name)(value)
 
-    # Normalisasi kategorikal
-    if feature_name in CATEGORICAL_MAP:
-        value_str = str(value).strip().lower()
-        valid_values = [v.lower() for v in CATEGORICAL_MAP[feature_name]]
-        if value_str in valid_values:
-            idx = valid_values.index(value_str)
-            return CATEGORICAL_MAP[feature_name][idx]
-        return value_str.capitalize()
 
-    # Normalisasi numerik
+class FeatureNormalizer:
+    """
+    Normalizer per model: converter tiap fitur disiapkan sekali
+    (lookup kategorikal lowercase, konversi numerik) lalu dipakai
+    untuk satu baris maupun banyak baris sekaligus.
+    """
+
+    def __init__(self, features):
+        self.features = list(features)
+        self._pairs = [(f, _converter_for(f)) for f in self.features]
+
+    def normalize_row(self, inputs, default=0):
+        """dict input -> list nilai sesuai urutan fitur"""
+        get = inputs.get
+        return [convert(get(f, default)) for f, convert in self._pairs]
+
+    def normalize_rows(self, rows, default=0):
+        """list dict input -> list baris (list nilai)"""
+        pairs = self._pairs
+        return [[convert(row.get(f, default)) for f, convert in pairs] for row in rows]
+
+    def normalize_columns(self, columns, default=0):
+        """
+        dict kolom {fitur: list nilai} -> dict kolom ternormalisasi.
+        Fitur yang tidak ada diisi nilai default.
+        """
+        n_rows = max((len(v) for v in columns.values()), default=0)
+        result = {}
+        for f, convert in self._pairs:
+            values = columns.get(f)
+            if values is None:
+                result[f] = [convert(default)] * n_rows
+            else:
+                result[f] = [convert(v) for v in values]
+        return result
+
+
+@lru_cache(maxsize=None)
+def _compile_normalizer(features):
+    return FeatureNormalizer(features)
+
+
+def get_normalizer(features):
+    """Mengambil normalizer (cache) untuk urutan fitur tertentu"""
+    return _compile_normalizer(tuple(features))
+
+
+# ============================================================
+# Skema Input Model (kolom numerik/kategorikal dari preprocessor)
+# ============================================================
+
+class ModelSchema:
+    """
+    Skema input sebuah model, diturunkan sekali dari
+    model.named_steps["preprocessor"].transformers_:
+    - kolom numerik  → float64, nilai kosong/tidak valid diisi 0.0
+    - kolom lainnya  → string, nilai kosong diisi "Unknown"
+    Model tanpa preprocessor memakai nilai apa adanya (kosong → 0).
+    """
+
+    NUMERIC_FILL = NUMERIC_FILL
+    CATEGORICAL_FILL = CATEGORICAL_FILL
+
+    def __init__(self, features, num_cols=None):
+        self.features = list(features)
+        self.has_preprocessor = num_cols is not None
+        num_set = set(num_cols or [])
+        self.num_cols = [f for f in self.features if f in num_set]
+        self.cat_cols = [f for f in self.features if f not in num_set] if self.has_preprocessor else []
+        self.dtypes = {f: ("float64" if f in num_set else "object") for f in self.features}
+        self.fill_values = {
+            f: (self.NUMERIC_FILL if f in num_set else self.CATEGORICAL_FILL) for f in self.features
+        }
+
+    @classmethod
+    def from_model(cls, model, features):
+        num_cols = []
+        try:
+            preproc = model.named_steps.get("preprocessor", None)
+        except AttributeError:
+            preproc = None
+        if preproc is None or not hasattr(preproc, "transformers_"):
+            return cls(features)
+
+        for name, transformer, cols in preproc.transformers_:
+            if name == "num":
+                num_cols.extend(cols)
+        return cls(features, num_cols)
+
+    def build_frame(self, rows):
+        """
+        Membentuk DataFrame bertipe benar dari list baris dalam sekali jalan
+        (konversi per kolom, bukan per sel).
+        """
+        import numpy as np
+        import pandas as pd
+
+        if not self.has_preprocessor:
+            X_input = pd.DataFrame(rows, columns=self.features)
+            return X_input.replace([None, np.nan, "nan", "NaN"], 0)
+
+        columns = list(zip(*rows)) if rows else [()] * len(self.features)
+        data = {}
+        for feature, values in zip(self.features, columns):
+            if self.dtypes[feature] == "float64":
+                data[feature] = np.fromiter((coerce_numeric(v) for v in values), dtype=np.float64, count=len(values))
+            else:
+                fill = self.CATEGORICAL_FILL
+                data[feature] = np.array([fill if is_null(v) else str(v) for v in values], dtype=object)
+        return pd.DataFrame(data, columns=self.features)
+
+
+# model -> ModelSchema (hilang otomatis saat model di-garbage-collect)
+_SCHEMAS = weakref.WeakKeyDictionary()
+
+
+def get_model_schema(model, features):
+    """Mengambil (atau membangun sekali) skema input untuk model"""
     try:
-        return float(value)
-    except (ValueError, TypeError):
-        return 0.0
+        schema = _SCHEMAS.get(model)
+    except TypeError:
+        return ModelSchema.from_model(model, features)
+    if schema is None or schema.features != list(features):
+        schema = ModelSchema.from_model(model, features)
+        _SCHEMAS[model] = schema
+    return schema
 
 
-def predict_with_model(model, input_values, feature_names):
-    """Prediksi berdasarkan model dan input"""
-    X_input = pd.DataFrame([input_values], columns=feature_names)
-    X_input = X_input.replace([None, np.nan, "nan", "NaN"], 0)
+# Jalur cepat NumPy: preprocessor dikompilasi (pipeline_compiler) dan sudah
+# diverifikasi identik dengan pipeline. MVCO_FAST_PATH=0 untuk mematikan.
+FAST_PATH_ENABLED = os.getenv("MVCO_FAST_PATH", "1") != "0"
+
+# model -> CompiledPipeline (atau _NO_FAST_PATH jika model tidak bisa dikompilasi)
+_FAST_PATHS = weakref.WeakKeyDictionary()
+_NO_FAST_PATH = object()
+
+
+_COMPILE_LOCK = threading.Lock()
+
+
+def _cached_fast_path(model, features):
+    compiled = _FAST_PATHS.get(model)
+    if compiled is not None and compiled is not _NO_FAST_PATH and compiled.features != list(features):
+        return None
+    return compiled
 
+
+def get_fast_path(model, features):
+    """
+    Mengambil (atau mengompilasi sekali) jalur cepat untuk model; None jika tidak tersedia.
+    Model dari .pkl dikompilasi & diverifikasi pada pemanggilan pertama, lalu menggantikan
+    Pipeline sklearn-nya di registry.
+    """
+    from pipeline_compiler import CompiledPipeline
+
+    if isinstance(model, CompiledPipeline):
+        return model   # model di registry yang sudah diganti jalur cepatnya
+    if not FAST_PATH_ENABLED:
+        return None
     try:
-        prediction = model.predict(X_input)
-        prob = None
-        if hasattr(model, "predict_proba"):
-            proba = model.predict_proba(X_input)
-            if proba.shape[1] > 1:
-                prob = {str(cls): float(p) for cls, p in zip(model.classes_, proba[0])}
-            else:
-                prob = {"Positive": float(proba[0][0])}
-        return prediction[0], prob
+        compiled = _cached_fast_path(model, features)
+    except TypeError:
+        return None
+    if compiled is None:
+        from pipeline_compiler import compile_pipeline
+
+        with _COMPILE_LOCK:
+            compiled = _cached_fast_path(model, features)
+            if compiled is None:
+                compiled = compile_pipeline(model, features) or _NO_FAST_PATH
+                _FAST_PATHS[model] = compiled
+                if compiled is not _NO_FAST_PATH:
+                    _promote_fast_path(model, compiled)
+    return None if compiled is _NO_FAST_PATH else compiled
+
+
+def _promote_fast_path(model, compiled):
+    """
+    Entry registry yang masih memakai `model` beralih ke jalur cepat yang sudah
+    terverifikasi identik: Pipeline sklearn (preprocessor) dilepas; forest sklearn-nya
+    tetap ada di jalur cepat untuk batch > FOREST_MAX_BATCH.
+    """
+    from forest_compiler import CompiledForest
+
+    forest = "memory" if isinstance(compiled.estimator, CompiledForest) else None
+    with _REGISTRY_LOCK:
+        for name, entry in list(_MODEL_REGISTRY.items()):
+            if entry["model"] is model:
+                _MODEL_REGISTRY[name] = dict(entry, model=compiled, stats=dict(entry["stats"], forest=forest))
+
+
+def _probabilities_from_row(classes, proba_row):
+    """Membentuk dict probabilitas dari satu baris output predict_proba"""
+    if len(proba_row) > 1:
+        return {str(cls): float(p) for cls, p in zip(classes, proba_row)}
+    return {"Positive": float(proba_row[0])}
+
+
+def predict_batch_with_model(model, rows, feature_names):
+    """
+    Prediksi banyak baris sekaligus dalam satu panggilan model.
+    rows berupa list input (list nilai sesuai urutan feature_names).
+    Label diturunkan dari predict_proba (argmax) sehingga forest hanya
+    ditelusuri sekali. Mengembalikan list tuple (prediction, prob).
+    """
+    if not rows:
+        return []
+
+    import numpy as np
+
+    fast = get_fast_path(model, feature_names)
+    if fast is not None:
+        # tanpa DataFrame: vektor NumPy langsung ke estimator
+        X_input, estimator = fast.transform(rows), fast.estimator_for(len(rows))
+    else:
+        X_input, estimator = get_model_schema(model, feature_names).build_frame(rows), model
+
+    try:
+        if not hasattr(estimator, "predict_proba"):
+            predictions = estimator.predict(X_input)
+            return [(pred, None) for pred in predictions]
+
+        proba = estimator.predict_proba(X_input)
+        classes = estimator.classes_
+        labels = classes.take(np.argmax(proba, axis=1))
+        return [
+            (label, _probabilities_from_row(classes, proba_row))
+            for label, proba_row in zip(labels, proba)
+        ]
     except Exception as e:
-        return f"Error: {e}", None
+        return [(f"Error: {e}", None)] * len(rows)
+
+
+def predict_with_model(model, input_values, feature_names):
+    """Prediksi berdasarkan model dan input"""
+    return predict_batch_with_model(model, [input_values], feature_names)[0]
+
 
+def build_prediction_entry(model_name, features, inputs, prediction, probabilities=None):
+    """Membentuk satu record log prediksi (nilai numpy dikonversi ke tipe native)"""
+    import numpy as np
 
-def save_prediction_to_json(model_name, features, inputs, prediction, probabilities=None, filename="SaveJson/prediction_log.json"):
-    """Menyimpan hasil prediksi ke JSON"""
-    os.makedirs("SaveJson", exist_ok=True)
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     def convert(val):
-        if isinstance(val, (np.integer, np.floating)):
+        if isinstance(val, np.bool_):
+            return bool(val)
+        if isinstance(val, np.integer):
+            return int(val)
+        if isinstance(val, np.floating):
             return float(val)
         if isinstance(val, (np.ndarray, list, tuple)):
             return [convert(v) for v in val]
@@ -168,7 +690,7 @@ def save_prediction_to_json(model_name, features, inputs, prediction, probabilit
             return {k: convert(v) for k, v in val.items()}
         return val
 
-    data_entry = {
+    return {
         "Timestamp": timestamp,
         "Model": str(model_name),
         "Prediction": convert(prediction),
@@ -176,29 +698,63 @@ def save_prediction_to_json(model_name, features, inputs, prediction, probabilit
         "Inputs": {str(feat): convert(val) for feat, val in zip(features, inputs)}
     }
 
-    existing = []
-    if os.path.exists(filename):
-        try:
-            with open(filename, "r", encoding="utf-8") as f:
-                existing = json.load(f)
-                if not isinstance(existing, list):
-                    existing = [existing]
-        except json.JSONDecodeError:
-            existing = []
 
-    existing.append(data_entry)
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(existing, f, indent=4, ensure_ascii=False)
+def save_prediction_to_json(model_name, features, inputs, prediction, probabilities=None, filename=LOG_PATH):
+    """
+    Menambahkan hasil prediksi ke log JSON Lines (append-only).
+    Jika sink asinkron aktif, record diserahkan ke thread penulis.
+    """
+    entry = build_prediction_entry(model_name, features, inputs, prediction, probabilities)
+    sink = get_log_sink()
+    if sink is not None and sink.path == filename:
+        sink.submit(entry)
+    else:
+        append_predictions([entry], filename)
 
 
 def get_test_inputs():
-    """Data dummy untuk uji otomatis"""
+    """
+    Menghasilkan data uji (dummy) untuk setiap model.
+    Data ini digunakan untuk menguji sistem prediksi secara otomatis
+    tanpa input manual.
+    """
     return {
-        "weather": {'Temperature_C': 30.5, 'Humidity_Percent': 78, 'Rainfall_mm': 5.2, 'Wind_Speed_mps': 3.4,
-                    'Wind_Direction_deg': 120, 'Visibility_km': 8.5, 'Pressure_hPa': 1010, 'Sea_State_Level': 2,
-                    'Wave_Height_m': 1.2, 'Tide_Level_m': 0.6, 'Storm_Warning': 0, 'Weather_Condition': "Clear"},
-        "road": {'Surface_Type': "Asphalt", 'Surface_Condition': "Wet", 'Pothole_Density': 0.3, 'Slope_Angle_Degrees': 5,
-                 'Traffic_Density': 0.7, 'Flood_Level_m': 0.1, 'Access_Status': "Open", 'Dust_Level_PPM': 45,
-                 'Ground_Vibration_mm_s': 2.1, 'Road_Temperature_C': 35, 'Rainfall_mm': 4.5, 'Soil_Moisture_%': 35,
-                 'Maintenance_Activity': "None", 'Accident_Count': 1},
+        "weather": {
+            'Temperature_C': 30.5, 'Humidity_Percent': 78, 'Rainfall_mm': 5.2, 'Wind_Speed_mps': 3.4,
+            'Wind_Direction_deg': 120, 'Visibility_km': 8.5, 'Pressure_hPa': 1010, 'Sea_State_Level': 2,
+            'Wave_Height_m': 1.2, 'Tide_Level_m': 0.6, 'Storm_Warning': 0, 'Weather_Condition': "Clear"
+        },
+        "road": {
+            'Surface_Type': "Asphalt", 'Surface_Condition': "Wet", 'Pothole_Density': 0.3, 'Slope_Angle_Degrees': 5,
+            'Traffic_Density': 0.7, 'Flood_Level_m': 0.1, 'Access_Status': "Open", 'Dust_Level_PPM': 45,
+            'Ground_Vibration_mm_s': 2.1, 'Road_Temperature_C': 35, 'Rainfall_mm': 4.5, 'Soil_Moisture_%': 35,
+            'Maintenance_Activity': "None", 'Accident_Count': 1
+        },
+        "equipment": {
+            'Machine_Type': "Excavator", 'Engine_Temperature_C': 82, 'Oil_Pressure_Bar': 4.2, 'Fuel_Level_Percent': 65,
+            'Engine_RPM': 1800, 'Vibration_Level_g': 0.8, 'Hydraulic_Pressure_Bar': 210, 'Working_Hours': 6.5,
+            'Maintenance_Status': "OK", 'Fault_Code': 0, 'Operational_Mode': "Active", 'Ambient_Temperature_C': 32,
+            'Gear_Position': "3", 'Fuel_Consumption_L_h': 12.5, 'Torque_Nm': 450, 'Engine_Load_Percent': 78
+        },
+        "vessel": {
+            'Delay_Minutes': 15, 'Cargo_Type': "Coal", 'Load_Weight_Tons': 1200, 'Port_Condition': "Normal",
+            'Weather_Impact_Score': 0.6, 'Sea_Condition_Code': "Moderate", 'Crew_Availability_Percent': 95,
+            'Vessel_Status': "Departed", 'Fuel_Consumption_Tons': 20.5, 'Engine_RPM': 1600, 'Distance_Traveled_km': 320,
+            'Average_Speed_knots': 14, 'Departure_Hour': 8, 'Departure_Weekday': 3, 'Departure_Month': 11,
+            'Planned_Duration_hours': 10
+        },
+        "logistics": {
+            'Date': "2025-11-11", 'Route_Code': "R123", 'Origin_Location': "Pontianak", 'Destination_Location': "Balikpapan",
+            'Cargo_Type': "Fuel", 'Cargo_Weight_Tons': 35, 'Transport_Mode': "Truck", 'Distance_km': 470,
+            'Travel_Time_hr': 9.5, 'Actual_Travel_Time_hr': 10.2, 'Fuel_Used_Liters': 220, 'Fuel_Cost_USD': 180,
+            'Delivery_Status': "Completed", 'Delay_Cause': "Traffic", 'CO2_Emission_kg': 75
+        },
+        "production": {
+            'Record_Timestamp': "2025-11-11 10:00:00", 'Production_ID': "PRD_091", 'Date': "2025-11-11",
+            'Machine_ID': "MCH_07", 'Shift': "Morning", 'Operator_ID': "OP_12", 'Material_Type': "Iron Ore",
+            'Working_Hours': 8, 'Production_Tons': 420, 'Fuel_Consumed_Liters': 140, 'Downtime_Minutes': 25,
+            'Weather_Condition': "Sunny", 'Road_Condition_Status': "Good", 'Equipment_Efficiency_Percent': 88,
+            'Fuel_Efficiency_Tons_per_Liter': 3.0, 'Incident_Report': 0, 'Maintenance_Required': 0,
+            'CO2_Emission_kg': 65, 'Production_Cost_USD': 21000, 'Revenue_USD': 28000
+        }
     }
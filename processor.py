@@ -1,6 +1,8 @@
 # parsing record & sort probabilitas
 
 # processor.py
+import hashlib
+import json
 from typing import Tuple, Dict, List
 
 def sort_probabilities(probabilities: Dict[str, float]) -> List[tuple]:
@@ -16,9 +18,39 @@ def prepare_recommendation_payload(record: Dict) -> Tuple[str, str, Dict, List[s
     """
     model_name = record.get("Model", "unknown")
     prediction = record.get("Prediction", "")
-    probabilities = record.get("Probabilities", {})
-    inputs = record.get("Inputs", {})
+    probabilities = record.get("Probabilities") or {}
+    inputs = record.get("Inputs") or {}
     sorted_probs = sort_probabilities(probabilities)
     sorted_labels = [label for label, _ in sorted_probs]
     return model_name, prediction, probabilities, sorted_labels, inputs
 
+
+def _fingerprint(timestamp, model_name, prediction, probabilities, inputs) -> str:
+    canonical = json.dumps(
+        [timestamp, model_name, prediction, probabilities or {}, inputs or {}],
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+def prediction_fingerprint(record: Dict) -> str:
+    """
+    Hash konten sebuah record prediksi (Timestamp, Model, Prediction,
+    Probabilities, Inputs) untuk mengenali prediksi yang sudah diproses.
+    """
+    return _fingerprint(
+        record.get("Timestamp"), record.get("Model", "unknown"), record.get("Prediction", ""),
+        record.get("Probabilities"), record.get("Inputs")
+    )
+
+def recommendation_fingerprint(rec: Dict) -> str:
+    """
+    Hash prediksi sumber dari sebuah record rekomendasi.
+    Memakai field source_hash jika ada; record lama dihitung ulang dari
+    field yang disalin dari prediksi sehingga hasilnya sama dengan prediction_fingerprint.
+    """
+    if rec.get("source_hash"):
+        return rec["source_hash"]
+    return _fingerprint(
+        rec.get("timestamp"), rec.get("model", "unknown"), rec.get("prediction", ""),
+        rec.get("probabilities"), rec.get("inputs")
+    )
@@ -3,20 +3,24 @@
 # review_manager.py
 import uuid
 from datetime import datetime
-from storage import load_json, save_json
+from storage import load_json, update_json, query_recommendations
 from status_manager import update_status_for_recommendation
 
 REVIEWS_PATH = "SaveJson/reviews.json"
-RECS_PATH = "SaveJson/recommendation_output.json"
+
+# role → status yang menunggu review dari role tersebut
+PENDING_STATUS_BY_ROLE = {
+    "mine_planner": "pending_review_mine_planner",
+    "shipping_planner": "pending_review_shipping_planner",
+}
 
 
 def load_reviews():
     return load_json(REVIEWS_PATH, [])
 
 def save_review(review):
-    reviews = load_reviews()
-    reviews.append(review)
-    save_json(REVIEWS_PATH, reviews)
+    # dikunci + ditulis atomik supaya dua reviewer tidak saling menimpa
+    update_json(REVIEWS_PATH, lambda reviews: reviews.append(review), [])
 
 def add_review(recommendation_id: str, role: str, reviewer_name: str, action: str, comments: str):
     review_record = {
@@ -28,22 +32,15 @@ def add_review(recommendation_id: str, role: str, reviewer_name: str, action: st
         "comments": comments,
         "timestamp": datetime.utcnow().isoformat()
     }
-    save_review(review_record)
-
-    # update recommendation status based on action
+    # update recommendation status based on action; review hanya dicatat jika
+    # statusnya berhasil diubah (konflik → ConcurrentUpdateError ke pemanggil)
     update_status_for_recommendation(recommendation_id, role, action, comments)
+    save_review(review_record)
 
     return review_record
 
 def list_pending_for_role(role: str):
-    recs = load_json(RECS_PATH, [])
-    res = []
-    for r in recs:
-        assigned = r.get("assigned_reviewers", [])
-        status = r.get("status", "")
-        # show if status pending for this role
-        if role == "mine_planner" and status == "pending_review_mine_planner":
-            res.append(r)
-        if role == "shipping_planner" and status == "pending_review_shipping_planner":
-            res.append(r)
-    return res
+    status = PENDING_STATUS_BY_ROLE.get(role)
+    if status is None:
+        return []
+    return query_recommendations(status=status)
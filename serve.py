@@ -0,0 +1,210 @@
+# mode serving produksi: model dimuat sekali di proses induk, worker di-fork (copy-on-write)
+
+# serve.py
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from collections import deque
+
+import uvicorn
+
+HOST = os.getenv("MVCO_HOST", "0.0.0.0")
+PORT = int(os.getenv("MVCO_PORT", 8000))
+# Jumlah proses worker; default = jumlah core. Model tidak diduplikasi per worker:
+# halaman memori model dibagi antar proses selama tidak ditulis (copy-on-write).
+WORKERS = int(os.getenv("MVCO_WORKERS", os.cpu_count() or 1))
+BACKLOG = int(os.getenv("MVCO_BACKLOG", 2048))
+# Batas waktu worker lama menyelesaikan request saat shutdown/reload
+GRACEFUL_TIMEOUT = float(os.getenv("MVCO_GRACEFUL_TIMEOUT", 30))
+# Worker yang mati sebelum MIN_WORKER_UPTIME detik dianggap gagal start: spawn ulang
+# ditunda dengan backoff eksponensial (0.5s, 1s, 2s, ... maks RESPAWN_BACKOFF_MAX).
+MIN_WORKER_UPTIME = float(os.getenv("MVCO_MIN_WORKER_UPTIME", 5))
+RESPAWN_BACKOFF_BASE = 0.5
+RESPAWN_BACKOFF_MAX = float(os.getenv("MVCO_RESPAWN_BACKOFF_MAX", 30))
+# Menyerah (exit 1) jika worker crash MAX_CRASHES kali dalam CRASH_WINDOW detik
+MAX_CRASHES = int(os.getenv("MVCO_MAX_CRASHES", 10))
+CRASH_WINDOW = float(os.getenv("MVCO_CRASH_WINDOW", 60))
+
+
+def _bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _preload():
+    """Import aplikasi & muat semua model di induk, lalu bekukan objeknya dari GC."""
+    from app import app
+    from prediction_utils import warm_up_models
+
+    # jalur cepat dikompilasi di induk: worker tidak masing-masing mengompilasi (dan
+    # menyalin) forest saat request pertama
+    loaded = warm_up_models(compile_fast_path=True)
+    # gc.freeze memindahkan objek yang ada ke generasi permanen: GC di worker tidak
+    # menyentuh header objek model sehingga halaman memorinya tetap dibagi.
+    gc.collect()
+    gc.freeze()
+    return app, loaded
+
+
+class PreforkServer:
+    """
+    Supervisor sederhana: fork N worker uvicorn yang berbagi satu socket.
+    - worker yang mati di-spawn ulang (dengan backoff jika langsung mati lagi;
+      berhenti total jika crash terlalu sering)
+    - SIGHUP: model dimuat ulang di induk lalu worker diganti satu per satu
+      (worker baru siap dulu, baru worker lama dihentikan dengan SIGTERM)
+    - SIGTERM/SIGINT: semua worker dihentikan secara graceful
+    """
+
+    def __init__(self, app, sock: socket.socket, workers: int):
+        self.app = app
+        self.sock = sock
+        self.workers = max(1, workers)
+        self.children = {}          # pid → waktu spawn (monotonic)
+        self.exit_code = 0
+        self._retiring = set()      # pid yang sengaja dihentikan (reload/shutdown)
+        self._crashes = deque()     # waktu crash dalam CRASH_WINDOW terakhir
+        self._failed_starts = 0     # crash beruntun sebelum MIN_WORKER_UPTIME
+        self._next_spawn = 0.0
+        self._stopping = False
+        self._reload = False
+
+    def _spawn(self) -> int:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            return pid
+
+        # --- proses worker ---
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(sig, signal.SIG_DFL)
+        import prediction_utils
+
+        # .pkl yang berubah dimuat ulang induk saat SIGHUP, bukan oleh setiap worker
+        prediction_utils.RELOAD_ON_CHANGE = False
+        code = 0
+        try:
+            config = uvicorn.Config(self.app, lifespan="on", log_level=os.getenv("MVCO_LOG_LEVEL", "info"))
+            uvicorn.Server(config).run(sockets=[self.sock])
+        except BaseException:
+            traceback.print_exc()   # alasan worker mati terlihat di log supervisor
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)   # jangan jalankan atexit milik induk di worker
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            started = self.children.pop(pid, None)
+            if pid in self._retiring:
+                self._retiring.discard(pid)
+            elif started is not None:
+                self._on_crash(pid, os.waitstatus_to_exitcode(status), time.monotonic() - started)
+
+    def _on_crash(self, pid: int, code: int, uptime: float):
+        now = time.monotonic()
+        self._crashes.append(now)
+        while self._crashes and now - self._crashes[0] > CRASH_WINDOW:
+            self._crashes.popleft()
+        if len(self._crashes) >= MAX_CRASHES:
+            print(f"[serve] {len(self._crashes)} worker crash dalam {CRASH_WINDOW:.0f}s, server dihentikan")
+            self.exit_code = 1
+            self._stopping = True
+            return
+
+        self._failed_starts = self._failed_starts + 1 if uptime < MIN_WORKER_UPTIME else 0
+        delay = 0.0
+        if self._failed_starts:
+            delay = min(RESPAWN_BACKOFF_MAX, RESPAWN_BACKOFF_BASE * 2 ** (self._failed_starts - 1))
+        self._next_spawn = max(self._next_spawn, now + delay)
+        print(f"[serve] worker {pid} berhenti (kode {code}) setelah {uptime:.1f}s; "
+              f"spawn ulang dalam {delay:.1f}s")
+
+    def _terminate(self, pids, timeout: float = GRACEFUL_TIMEOUT):
+        self._retiring.update(pids)
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + timeout
+        while set(pids) & self.children.keys() and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in set(pids) & self.children.keys():
+            os.kill(pid, signal.SIGKILL)   # tidak selesai dalam batas waktu
+        self._reap()
+
+    def _reload_workers(self):
+        from prediction_utils import warm_up_models
+
+        gc.unfreeze()
+        loaded = warm_up_models(compile_fast_path=True)   # hanya file .pkl yang berubah yang dimuat ulang
+        gc.collect()
+        gc.freeze()
+        print(f"[serve] reload: {len(loaded)} model siap, mengganti {len(self.children)} worker")
+        for old in list(self.children):
+            self._spawn()
+            self._terminate([old])
+
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+
+    def _on_reload(self, signum, frame):
+        self._reload = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+
+        for _ in range(self.workers):
+            self._spawn()
+        print(f"[serve] {self.workers} worker melayani http://{HOST}:{PORT} (induk pid {os.getpid()})")
+
+        while not self._stopping:
+            if self._reload:
+                self._reload = False
+                self._reload_workers()
+            self._reap()
+            if not self._stopping and time.monotonic() >= self._next_spawn:
+                for _ in range(self.workers - len(self.children)):
+                    self._spawn()   # worker mati di luar reload/shutdown
+            time.sleep(0.1)
+
+        print("[serve] menghentikan worker...")
+        self._terminate(list(self.children))
+        self.sock.close()
+        return self.exit_code
+
+
+def main():
+    if not hasattr(os, "fork"):
+        # Windows: tidak ada fork, uvicorn menjalankan worker via spawn
+        # (setiap worker memuat modelnya sendiri).
+        uvicorn.run("app:app", host=HOST, port=PORT, workers=WORKERS)
+        return
+
+    app, loaded = _preload()
+    print(f"[serve] {len(loaded)} model dimuat di induk: {', '.join(loaded)}")
+    sock = _bind_socket(HOST, PORT)
+    sys.exit(PreforkServer(app, sock, WORKERS).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# benchmark waktu startup (import) entry point, berbasis `python -X importtime`
+
+# startup_benchmark.py
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+# Modul entry point yang diukur: CLI, chatbox, API, dan inti prediksi
+TARGETS = ["main_entry", "app_cli", "ChatBox", "app", "prediction_utils"]
+
+
+def measure_import(module: str, runs: int = 3) -> Dict:
+    """
+    Import `module` di interpreter baru dengan -X importtime (tanpa cache modul).
+    Mengembalikan median waktu kumulatif (ms) dan import termahal dari run terakhir.
+    """
+    totals, rows = [], []
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    env.setdefault("GEMINI_API_KEY", "benchmark")   # tidak dipakai kecuali client dibuat saat import
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, env=env,
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"Import {module} gagal:\n{proc.stderr.strip().splitlines()[-1]}")
+        rows = _parse_importtime(proc.stderr)
+        totals.append(next(r["cumulative_us"] for r in reversed(rows) if r["name"] == module))
+    totals.sort()
+    top = sorted(_direct_imports(rows, module), key=lambda r: -r["cumulative_us"])[:8]
+    return {
+        "module": module,
+        "ms": round(totals[len(totals) // 2] / 1000, 1),
+        "top_imports": [(r["name"], round(r["cumulative_us"] / 1000, 1)) for r in top],
+    }
+
+
+def _parse_importtime(stderr: str) -> List[Dict]:
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # format: "import time: <self us> | <cumulative us> | <indentasi><nama>"
+        parts = line[len("import time:"):].split("|")
+        raw_name = parts[2]
+        rows.append({
+            "self_us": int(parts[0]),
+            "cumulative_us": int(parts[1]),
+            "name": raw_name.strip(),
+            "depth": (len(raw_name) - len(raw_name.lstrip(" ")) - 1) // 2 + 1,
+        })
+    return rows
+
+
+def _direct_imports(rows: List[Dict], module: str) -> List[Dict]:
+    """Import langsung milik `module` (importtime mencetak anak sebelum induknya)."""
+    end = max(i for i, r in enumerate(rows) if r["name"] == module and r["depth"] == 1)
+    direct = []
+    for row in reversed(rows[:end]):
+        if row["depth"] == 1:
+            break
+        if row["depth"] == 2:
+            direct.append(row)
+    return direct
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ukur waktu import entry point MVCO.")
+    parser.add_argument("modules", nargs="*", default=TARGETS)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--save", help="simpan hasil sebagai baseline (JSON)")
+    parser.add_argument("--baseline", help="bandingkan dengan baseline; exit 1 jika regresi")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="regresi relatif yang ditoleransi")
+    args = parser.parse_args(argv)
+
+    results = {m: measure_import(m, args.runs) for m in args.modules}
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    regressions = []
+    for module, res in results.items():
+        line = f"{module:<18} {res['ms']:>8.1f} ms"
+        if module in baseline:
+            before = baseline[module]["ms"]
+            line += f"   (baseline {before:.1f} ms, {res['ms'] - before:+.1f})"
+            if res["ms"] > before * (1 + args.tolerance):
+                regressions.append(module)
+                line += "  ← REGRESI"
+        print(line)
+        print("    " + ", ".join(f"{name} {ms}ms" for name, ms in res["top_imports"]))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if regressions:
+        print(f"Regresi waktu startup: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
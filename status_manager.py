@@ -1,53 +1,63 @@
 #alur status & update when review occurs
 # status_manager.py
-from storage import load_json, save_json
+from storage import get_recommendation, update_recommendation, ConcurrentUpdateError
 from datetime import datetime
 
-# status_manager.py
-RECS_PATH = "SaveJson/recommendation_output.json"
-
-
+MAX_UPDATE_ATTEMPTS = 5
 
-def _load_recs():
-    return load_json(RECS_PATH, [])
 
-def _save_recs(data):
-    save_json(RECS_PATH, data)
-
-def update_status_for_recommendation(rec_id: str, role: str, action: str, comments: str = None):
+def update_status_for_recommendation(rec_id: str, role: str, action: str, comments: str = None,
+                                     expected_status: str = None):
     """
     Update status based on which role reviews and action taken.
     role: 'mine_planner' or 'shipping_planner'
     action: 'approve' | 'reject' | 'request_changes'
+    expected_status: status record saat direview (default: status saat pertama dibaca)
     """
-    recs = _load_recs()
-    changed = False
-    for r in recs:
-        if r.get("id") == rec_id:
-            # default fields
-            history = r.setdefault("review_history", [])
-            history.append({
-                "role": role,
-                "action": action,
-                "comments": comments,
-                "timestamp": datetime.utcnow().isoformat()
-            })
-            # state transitions
-            if role == "mine_planner":
-                if action == "approve":
-                    r["status"] = "pending_review_shipping_planner"
-                else:
-                    # reject or request_changes
-                    r["status"] = "awaiting_revision_ai"
-            elif role == "shipping_planner":
-                if action == "approve":
-                    r["status"] = "final_approved"
-                else:
-                    r["status"] = "awaiting_revision_ai"
-            changed = True
-            # bump version
-            r["version"] = r.get("version", 1) + 1
-            r["last_updated"] = datetime.utcnow().isoformat()
-            break
-    if changed:
-        _save_recs(recs)
+    # optimistic concurrency: jika record diubah proses lain di antara baca & tulis,
+    # review diterapkan ulang hanya selama statusnya masih status yang direview;
+    # jika status sudah berubah (mis. dikembalikan reviewer lain), konflik dilempar
+    for attempt in range(MAX_UPDATE_ATTEMPTS):
+        r = get_recommendation(rec_id)
+        if r is None:
+            return
+        if expected_status is None:
+            expected_status = r.get("status")
+        elif r.get("status") != expected_status:
+            raise ConcurrentUpdateError(
+                f"Recommendation {rec_id} sudah berstatus '{r.get('status')}' "
+                f"(direview saat '{expected_status}')."
+            )
+        expected_version = r.get("version", 1)
+        _apply_review(r, role, action, comments)
+        try:
+            update_recommendation(r, expected_version=expected_version)
+            return r
+        except ConcurrentUpdateError:
+            if attempt == MAX_UPDATE_ATTEMPTS - 1:
+                raise
+
+def _apply_review(r, role, action, comments):
+    # default fields
+    history = r.setdefault("review_history", [])
+    history.append({
+        "role": role,
+        "action": action,
+        "comments": comments,
+        "timestamp": datetime.utcnow().isoformat()
+    })
+    # state transitions
+    if role == "mine_planner":
+        if action == "approve":
+            r["status"] = "pending_review_shipping_planner"
+        else:
+            # reject or request_changes
+            r["status"] = "awaiting_revision_ai"
+    elif role == "shipping_planner":
+        if action == "approve":
+            r["status"] = "final_approved"
+        else:
+            r["status"] = "awaiting_revision_ai"
+    # bump version
+    r["version"] = r.get("version", 1) + 1
+    r["last_updated"] = datetime.utcnow().isoformat()
@@ -1,26 +1,471 @@
-# abstraksi baca/tulis file JSON
+# abstraksi baca/tulis file JSON + store rekomendasi (SQLite)
 
 # storage.py
 import json
 import os
-from typing import Any
+import sqlite3
+import tempfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Format file JSON di disk: "compact" (tanpa spasi, default) atau "pretty" (indent=2).
+# Untuk dibaca manusia gunakan export_json.py yang mencetak versi pretty.
+SAVEJSON_FORMAT = os.getenv("SAVEJSON_FORMAT", "compact")
+
+_dirs_ready = False
 
 def ensure_dirs():
+    global _dirs_ready
+    if _dirs_ready:
+        return
     os.makedirs("data", exist_ok=True)
     os.makedirs("SaveJson", exist_ok=True)
+    _dirs_ready = True
+
+
+# ============================================================
+# Cache baca (read-through) untuk load_json
+# ============================================================
+
+def _readonly(self, *args, **kwargs):
+    raise TypeError("Data dari load_json() read-only; gunakan storage.thaw() untuk salinan yang bisa diubah.")
+
+class FrozenDict(dict):
+    """dict read-only (tetap bisa di-json.dumps karena subclass dict)."""
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = __ior__ = _readonly
+
+    def __reduce__(self):
+        return self.__class__, (dict(self),)
+
+class FrozenList(list):
+    """list read-only (tetap bisa di-json.dumps karena subclass list)."""
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+
+    def __reduce__(self):
+        return self.__class__, (list(self),)
+
+def freeze(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        return FrozenDict((k, freeze(v)) for k, v in obj.items())
+    if isinstance(obj, list):
+        return FrozenList(freeze(v) for v in obj)
+    return obj
+
+def thaw(obj: Any) -> Any:
+    """Salinan biasa (bisa diubah) dari data hasil load_json."""
+    if isinstance(obj, dict):
+        return {k: thaw(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [thaw(v) for v in obj]
+    return obj
+
+# path → (signature file, data frozen)
+_json_cache: Dict[str, tuple] = {}
+
+def _signature(st: os.stat_result) -> tuple:
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+def load_json(path: str, default: Any = None, mutable: bool = False):
+    """
+    Membaca file JSON dengan cache per path: file hanya di-parse ulang jika
+    mtime/ukuran/inode berubah. Hasilnya read-only (FrozenDict/FrozenList) agar
+    cache tidak bisa rusak oleh pemanggil; mutable=True mengembalikan salinan biasa.
+    """
+    ensure_dirs()
+    fallback = default if default is not None else []
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        _json_cache.pop(path, None)
+        return fallback
+
+    cached = _json_cache.get(path)
+    if cached is not None and cached[0] == _signature(st):
+        data = cached[1]
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            try:
+                data = freeze(json.load(f))
+            except ValueError:
+                return fallback
+            st = os.fstat(f.fileno())
+        _json_cache[path] = (_signature(st), data)
+    return thaw(data) if mutable else data
 
-def load_json(path: str, default: Any = None):
+@contextmanager
+def atomic_write(path: str):
+    """
+    Menulis ke file sementara di folder yang sama lalu os.replace ke path tujuan.
+    Pembaca tidak pernah melihat file yang terpotong; jika gagal, file lama utuh.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _dump_options(pretty: bool = None) -> Dict[str, Any]:
+    if pretty is None:
+        pretty = SAVEJSON_FORMAT == "pretty"
+    if pretty:
+        return {"indent": 2, "ensure_ascii": False}
+    return {"separators": (",", ":"), "ensure_ascii": False}
+
+def save_json(path: str, data: Any, pretty: bool = None):
     ensure_dirs()
+    with atomic_write(path) as f:
+        json.dump(data, f, **_dump_options(pretty))
+    _json_cache.pop(path, None)
+
+def update_json(path: str, update: Callable[[Any], Any], default: Any = None) -> Any:
+    """
+    Read-modify-write yang aman antar-proses: file dikunci, dibaca, diubah oleh
+    `update(data)` (boleh mengubah in-place dan mengembalikan None), lalu ditulis atomik.
+    """
+    with file_lock(path):
+        data = load_json(path, default, mutable=True)
+        result = update(data)
+        if result is not None:
+            data = result
+        save_json(path, data)
+    return data
+
+def iter_jsonl(path: str) -> Iterator[Any]:
+    """Membaca file JSON Lines baris demi baris; baris rusak/terpotong dilewati."""
     if not os.path.exists(path):
-        return default if default is not None else []
+        return
     with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Advisory lock antar-proses untuk sebuah file data.
+    Lock dipasang pada file pendamping <path>.lock supaya file data
+    sendiri tetap bisa di-rename/rotate selama lock dipegang.
+    """
+    lock_path = path + ".lock"
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with open(lock_path, "a+b") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        else:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
         try:
-            return json.load(f)
-        except:
-            return default if default is not None else []
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# ============================================================
+# Store rekomendasi (SQLite, terindeks)
+# ============================================================
+
+RECS_DB_PATH = "SaveJson/recommendations.sqlite3"
+LEGACY_RECS_PATH = "SaveJson/recommendation_output.json"   # format lama, diimpor sekali
+
+# kolom terindeks disalin dari record; record lengkap disimpan sebagai JSON di kolom data
+_INDEXED_FIELDS = ("status", "model", "timestamp", "source_hash", "version")
+
+_local = threading.local()
+
+
+def _init_recs_db(conn: sqlite3.Connection):
+    conn.execute("PRAGMA journal_mode=WAL")
+    with conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS recommendations ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " id TEXT NOT NULL UNIQUE,"
+            " status TEXT, model TEXT, timestamp TEXT, source_hash TEXT,"
+            " version INTEGER NOT NULL DEFAULT 1,"
+            " data TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_recs_status ON recommendations(status)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_recs_model ON recommendations(model)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_recs_timestamp ON recommendations(timestamp)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_recs_source_hash ON recommendations(source_hash)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    _init_recs_rev(conn)
+    _init_recs_counts(conn)
+    _migrate_legacy_recs(conn)
+
+
+# Ringkasan jumlah rekomendasi per (model, status), dijaga oleh trigger SQLite
+# sehingga selalu konsisten dengan tabel utama tanpa query agregasi.
+_COUNT_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS trg_recs_count_insert AFTER INSERT ON recommendations BEGIN"
+    " INSERT INTO recommendation_counts (model, status, n)"
+    " VALUES (COALESCE(NEW.model, ''), COALESCE(NEW.status, ''), 1)"
+    " ON CONFLICT (model, status) DO UPDATE SET n = n + 1;"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS trg_recs_count_delete AFTER DELETE ON recommendations BEGIN"
+    " UPDATE recommendation_counts SET n = n - 1"
+    " WHERE model = COALESCE(OLD.model, '') AND status = COALESCE(OLD.status, '');"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS trg_recs_count_update AFTER UPDATE OF model, status ON recommendations"
+    " WHEN OLD.model IS NOT NEW.model OR OLD.status IS NOT NEW.status BEGIN"
+    " UPDATE recommendation_counts SET n = n - 1"
+    " WHERE model = COALESCE(OLD.model, '') AND status = COALESCE(OLD.status, '');"
+    " INSERT INTO recommendation_counts (model, status, n)"
+    " VALUES (COALESCE(NEW.model, ''), COALESCE(NEW.status, ''), 1)"
+    " ON CONFLICT (model, status) DO UPDATE SET n = n + 1;"
+    " END",
+)
+
+
+# Nomor revisi global: setiap insert/update mendapat rev baru (MAX(rev) + 1) sehingga
+# pembaca inkremental cukup mengambil baris dengan rev > rev terakhir yang dibaca.
+_REV_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS trg_recs_rev_insert AFTER INSERT ON recommendations BEGIN"
+    " UPDATE recommendations SET rev = (SELECT COALESCE(MAX(rev), 0) + 1 FROM recommendations)"
+    " WHERE seq = NEW.seq;"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS trg_recs_rev_update"
+    " AFTER UPDATE OF status, model, timestamp, source_hash, version, data ON recommendations BEGIN"
+    " UPDATE recommendations SET rev = (SELECT COALESCE(MAX(rev), 0) + 1 FROM recommendations)"
+    " WHERE seq = NEW.seq;"
+    " END",
+)
+
+
+def _init_recs_rev(conn: sqlite3.Connection):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(recommendations)")}
+        if "rev" not in columns:
+            # DB lama: revisi awal mengikuti urutan insert
+            conn.execute("ALTER TABLE recommendations ADD COLUMN rev INTEGER")
+            conn.execute("UPDATE recommendations SET rev = seq")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_recs_rev ON recommendations(rev)")
+        for trigger in _REV_TRIGGERS:
+            conn.execute(trigger)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _init_recs_counts(conn: sqlite3.Connection):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recommendation_counts'"
+        ).fetchone()
+        if not exists:
+            conn.execute(
+                "CREATE TABLE recommendation_counts ("
+                " model TEXT NOT NULL, status TEXT NOT NULL, n INTEGER NOT NULL,"
+                " PRIMARY KEY (model, status))"
+            )
+            # DB lama: isi awal dari data yang sudah ada
+            conn.execute(
+                "INSERT INTO recommendation_counts (model, status, n)"
+                " SELECT COALESCE(model, ''), COALESCE(status, ''), COUNT(*)"
+                " FROM recommendations GROUP BY 1, 2"
+            )
+        for trigger in _COUNT_TRIGGERS:
+            conn.execute(trigger)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _migrate_legacy_recs(conn: sqlite3.Connection):
+    """Impor recommendation_output.json ke SQLite satu kali (dicatat di tabel meta)."""
+    from processor import recommendation_fingerprint
+
+    conn.execute("BEGIN IMMEDIATE")  # cegah dua proses mengimpor bersamaan
+    try:
+        done = conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_json_imported'").fetchone()
+        if not done and os.path.exists(LEGACY_RECS_PATH):
+            with open(LEGACY_RECS_PATH, "r", encoding="utf-8") as f:
+                try:
+                    legacy = json.load(f)
+                except json.JSONDecodeError:
+                    legacy = []
+            for rec in legacy if isinstance(legacy, list) else []:
+                if not rec.get("source_hash"):
+                    rec["source_hash"] = recommendation_fingerprint(rec)
+                conn.execute(
+                    "INSERT OR IGNORE INTO recommendations"
+                    " (id, status, model, timestamp, source_hash, version, data)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    _row_values(rec),
+                )
+        if not done:
+            conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_json_imported', '1')")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _recs_conn(path: str = None) -> sqlite3.Connection:
+    """Koneksi SQLite per-thread (dibuat & diinisialisasi sekali)."""
+    path = path or RECS_DB_PATH
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        _init_recs_db(conn)
+        conns[path] = conn
+    return conn
+
+
+def _row_values(rec: Dict) -> tuple:
+    return (
+        rec["id"], rec.get("status"), rec.get("model"), rec.get("timestamp"),
+        rec.get("source_hash"), int(rec.get("version", 1)),
+        json.dumps(rec, ensure_ascii=False, separators=(",", ":")),
+    )
+
+
+def insert_recommendation(rec: Dict):
+    insert_recommendations([rec])
+
+
+def insert_recommendations(recs: Iterable[Dict]):
+    conn = _recs_conn()
+    with conn:
+        conn.executemany(
+            "INSERT INTO recommendations (id, status, model, timestamp, source_hash, version, data)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (_row_values(rec) for rec in recs),
+        )
+
+
+def get_recommendation(rec_id: str) -> Optional[Dict]:
+    row = _recs_conn().execute("SELECT data FROM recommendations WHERE id = ?", (rec_id,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def query_recommendations(status: str = None, model: str = None, since: str = None,
+                          until: str = None, limit: int = None) -> List[Dict]:
+    """
+    Mengambil rekomendasi (urut sesuai waktu dimasukkan) dengan filter terindeks:
+    status, model, dan rentang timestamp [since, until].
+    """
+    clauses, params = [], []
+    if status is not None:
+        clauses.append("status = ?")
+        params.append(status)
+    if model is not None:
+        clauses.append("model = ?")
+        params.append(model)
+    if since is not None:
+        clauses.append("timestamp >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("timestamp <= ?")
+        params.append(until)
+    sql = "SELECT data FROM recommendations"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY seq"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    return [json.loads(row[0]) for row in _recs_conn().execute(sql, params)]
+
+
+class ConcurrentUpdateError(Exception):
+    """Record sudah diubah proses lain sejak dibaca (version tidak cocok)."""
+
+
+def update_recommendation(rec: Dict, expected_version: int = None) -> bool:
+    """
+    Menulis ulang satu record (berdasarkan id). False jika id tidak ada.
+    Optimistic concurrency: jika expected_version diberikan, update hanya berhasil
+    bila version di store masih sama; jika tidak, ConcurrentUpdateError dilempar.
+    """
+    values = _row_values(rec)
+    sql = ("UPDATE recommendations SET status = ?, model = ?, timestamp = ?, source_hash = ?,"
+           " version = ?, data = ? WHERE id = ?")
+    params = values[1:] + values[:1]
+    if expected_version is not None:
+        sql += " AND version = ?"
+        params += (int(expected_version),)
+
+    conn = _recs_conn()
+    with conn:
+        cur = conn.execute(sql, params)
+    if cur.rowcount > 0:
+        return True
+    if expected_version is not None:
+        row = conn.execute("SELECT version FROM recommendations WHERE id = ?", (rec["id"],)).fetchone()
+        if row is not None:
+            raise ConcurrentUpdateError(
+                f"Recommendation {rec['id']} sudah diubah (version {row[0]}, diharapkan {expected_version})."
+            )
+    return False
+
+
+def recommendation_source_hashes() -> Counter:
+    """Counter source_hash → jumlah rekomendasi (untuk generate incremental)."""
+    rows = _recs_conn().execute(
+        "SELECT source_hash, COUNT(*) FROM recommendations WHERE source_hash IS NOT NULL GROUP BY source_hash"
+    )
+    return Counter(dict(rows))
+
+
+def recommendation_changes(since_rev: int = 0) -> Tuple[List[Dict], int]:
+    """Rekomendasi yang dimasukkan/diubah setelah revisi `since_rev`, beserta revisi terbaru."""
+    rows = _recs_conn().execute(
+        "SELECT rev, data FROM recommendations WHERE rev > ? ORDER BY rev", (int(since_rev),)
+    ).fetchall()
+    latest = rows[-1][0] if rows else since_rev
+    return [json.loads(data) for _, data in rows], latest
+
+
+def count_recommendations() -> int:
+    return _recs_conn().execute("SELECT COUNT(*) FROM recommendations").fetchone()[0]
+
+
+def recommendation_counts() -> Dict[tuple, int]:
+    """Jumlah rekomendasi per (model, status) dari tabel ringkasan (tanpa scan)."""
+    rows = _recs_conn().execute(
+        "SELECT model, status, n FROM recommendation_counts WHERE n > 0"
+    )
+    return {(model or None, status or None): n for model, status, n in rows}
 
-def save_json(path: str, data: Any):
-    ensure_dirs()
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
 
+def clear_recommendations():
+    conn = _recs_conn()
+    with conn:
+        conn.execute("DELETE FROM recommendations")
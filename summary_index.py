@@ -0,0 +1,227 @@
+# ringkasan agregat (jumlah per model/prediksi/hari/role + prediksi terakhir), diperbarui inkremental dari log
+
+# summary_index.py
+import argparse
+import os
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, Iterable, Optional
+
+from prediction_log import LEGACY_LOG_PATH, list_log_segments, read_from_cursor, sync_log_cursors
+from storage import load_json, recommendation_counts, update_json
+
+SUMMARY_PATH = "SaveJson/summary_index.json"
+SUMMARY_ENABLED = os.getenv("SUMMARY_INDEX", "1") != "0"
+
+# Struktur file:
+# {
+#   "predictions": {"by_day": {day: {model: {prediction: n}}}, "latest": {model: record}},
+#   "reviews": {"by_day": {day: {role: {action: n}}}},
+#   "cursors": {"logs": {kunci file log: {"offset", "head"}}, "legacy": signature, "reviews": n}
+# }
+# Ringkasan tidak ditulis saat prediksi/review disimpan: saat dibaca, hanya data setelah
+# cursor (byte log, jumlah review) yang ditambahkan. Penulis tetap murah dan ringkasan
+# tidak bisa tertinggal permanen karena crash di antara dua penulisan.
+# Jumlah rekomendasi per status tidak disimpan di sini: dijaga trigger di store SQLite.
+
+
+def _empty() -> Dict:
+    return {
+        "predictions": {"by_day": {}, "latest": {}},
+        "reviews": {"by_day": {}},
+        "cursors": {"logs": {}, "legacy": None, "reviews": 0},
+    }
+
+
+def _bump(tree: Dict, day: str, group: str, key: str, n: int = 1):
+    counts = tree.setdefault(day, {}).setdefault(group, {})
+    counts[key] = counts.get(key, 0) + n
+
+
+def _add_predictions(summary: Dict, entries: Iterable[Dict]):
+    preds = summary["predictions"]
+    by_day, latest = preds["by_day"], preds["latest"]
+    for entry in entries:
+        model = str(entry.get("Model") or "unknown")
+        ts = str(entry.get("Timestamp") or "")
+        _bump(by_day, ts[:10] or "unknown", model, str(entry.get("Prediction")))
+        current = latest.get(model)
+        if current is None or ts >= str(current.get("Timestamp") or ""):
+            latest[model] = dict(entry)
+
+
+def _add_reviews(summary: Dict, reviews: Iterable[Dict]):
+    by_day = summary["reviews"]["by_day"]
+    for review in reviews:
+        day = str(review.get("timestamp") or "")[:10] or "unknown"
+        _bump(by_day, day, str(review.get("role")), str(review.get("action")))
+
+
+def _signature(path: str):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _legacy_records():
+    records = load_json(LEGACY_LOG_PATH, [])
+    return records if isinstance(records, list) else [records]
+
+
+def _catch_up(summary: Dict) -> Dict:
+    """Menambahkan data yang belum tercatat (setelah cursor) ke ringkasan."""
+    from review_manager import REVIEWS_PATH, load_reviews
+
+    if not isinstance(summary, dict) or "cursors" not in summary:
+        summary = _empty()   # file belum ada / format lama tanpa cursor: hitung dari awal
+    cursors = summary["cursors"]
+
+    legacy = _signature(LEGACY_LOG_PATH)
+    if legacy != cursors["legacy"]:
+        if cursors["legacy"] is not None:
+            return _catch_up(_empty())   # log lama diubah: tidak bisa dihitung sebagian
+        _add_predictions(summary, _legacy_records())
+        cursors["legacy"] = legacy
+
+    # file log yang hilang (mis. segmen dihapus) tetap terhitung; hanya byte baru yang dibaca
+    _, pending = sync_log_cursors(cursors["logs"], list_log_segments())
+    for key, path in pending:
+        _add_predictions(summary, (rec for _, rec in read_from_cursor(cursors["logs"][key], path)))
+
+    if _signature(REVIEWS_PATH) != cursors.get("reviews_signature"):
+        reviews = load_reviews()
+        if len(reviews) < cursors["reviews"]:
+            summary["reviews"]["by_day"], cursors["reviews"] = {}, 0
+        _add_reviews(summary, reviews[cursors["reviews"]:])
+        cursors["reviews"] = len(reviews)
+        cursors["reviews_signature"] = _signature(REVIEWS_PATH)
+    return summary
+
+
+def _is_current(summary: Dict) -> bool:
+    """Cek murah (hanya stat): apakah ada data baru sejak ringkasan terakhir ditulis."""
+    from review_manager import REVIEWS_PATH
+
+    cursors = summary.get("cursors") if isinstance(summary, dict) else None
+    if not cursors:
+        return False
+    if _signature(LEGACY_LOG_PATH) != cursors["legacy"]:
+        return False
+    if _signature(REVIEWS_PATH) != cursors.get("reviews_signature"):
+        return False
+    segments = list_log_segments()
+    if len(segments) != len(cursors["logs"]):
+        return False
+    for path in segments:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return False
+        cursor = cursors["logs"].get(f"{st.st_dev}:{st.st_ino}")
+        if cursor is None or cursor["offset"] != st.st_size:
+            return False
+    return True
+
+
+def rebuild_summary() -> Dict:
+    """Menghitung ulang ringkasan dari seluruh log & review."""
+    return update_json(SUMMARY_PATH, lambda _: _catch_up(_empty()), _empty())
+
+
+def load_summary() -> Dict:
+    """Ringkasan terkini: file ringkasan + data yang masuk sejak terakhir diperbarui."""
+    if not SUMMARY_ENABLED:
+        return _catch_up(_empty())   # tanpa file ringkasan: dihitung dari seluruh data
+    summary = load_json(SUMMARY_PATH, _empty())
+    if _is_current(summary):
+        return summary
+    return update_json(SUMMARY_PATH, _catch_up, _empty())
+
+
+# ============================================================
+# Query ringkasan
+# ============================================================
+
+def _in_range(day: str, since: Optional[str], until: Optional[str]) -> bool:
+    return (since is None or day >= since) and (until is None or day <= until)
+
+
+def prediction_counts(model: str = None, since: str = None, until: str = None) -> Counter:
+    """Counter prediksi → jumlah (opsional per model dan rentang hari 'YYYY-MM-DD')."""
+    counts = Counter()
+    for day, models in load_summary()["predictions"]["by_day"].items():
+        if not _in_range(day, since, until):
+            continue
+        for name, preds in models.items():
+            if model is None or name == model:
+                counts.update(preds)
+    return counts
+
+
+def prediction_counts_by_model(since: str = None, until: str = None) -> Counter:
+    counts = Counter()
+    for day, models in load_summary()["predictions"]["by_day"].items():
+        if _in_range(day, since, until):
+            for name, preds in models.items():
+                counts[name] += sum(preds.values())
+    return counts
+
+
+def latest_prediction(model: str) -> Optional[Dict]:
+    return load_summary()["predictions"]["latest"].get(model)
+
+
+def review_counts(role: str = None, since: str = None, until: str = None) -> Counter:
+    """Counter aksi review → jumlah (opsional per role)."""
+    counts = Counter()
+    for day, roles in load_summary()["reviews"]["by_day"].items():
+        if not _in_range(day, since, until):
+            continue
+        for name, actions in roles.items():
+            if role is None or name == role:
+                counts.update(actions)
+    return counts
+
+
+def recommendation_status_counts(model: str = None) -> Counter:
+    counts = Counter()
+    for (name, status), n in recommendation_counts().items():
+        if model is None or name == model:
+            counts[status] += n
+    return counts
+
+
+def period_range(period: str, today: date = None):
+    """'today' | 'yesterday' | 'week' | 'month' → (since, until) dalam format YYYY-MM-DD."""
+    today = today or date.today()
+    if period == "today":
+        start = end = today
+    elif period == "yesterday":
+        start = end = today - timedelta(days=1)
+    elif period == "week":
+        start, end = today - timedelta(days=today.weekday()), today
+    elif period == "month":
+        start, end = today.replace(day=1), today
+    else:
+        return None, None
+    return start.isoformat(), end.isoformat()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ringkasan agregat prediksi & review.")
+    parser.add_argument("--rebuild", action="store_true", help="hitung ulang dari seluruh log & review")
+    args = parser.parse_args(argv)
+
+    summary = rebuild_summary() if args.rebuild else load_summary()
+    counts = Counter()
+    for models in summary["predictions"]["by_day"].values():
+        for name, preds in models.items():
+            counts[name] += sum(preds.values())
+    print(f"Prediksi per model: {dict(counts)}")
+    print(f"Review per aksi: {dict(review_counts())}")
+
+
+if __name__ == "__main__":
+    main()
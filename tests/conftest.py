@@ -0,0 +1,22 @@
+# modul aplikasi berada di root repo (layout flat)
+
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Direktori kerja kosong: semua path data (SaveJson/...) relatif terhadap cwd."""
+    import storage
+
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("SaveJson", exist_ok=True)
+    # koneksi SQLite per-thread di-cache per path relatif; jangan bawa dari test lain
+    monkeypatch.setattr(storage._local, "conns", {}, raising=False)
+    storage._json_cache.clear()
+    return tmp_path
@@ -0,0 +1,54 @@
+# client LLM palsu (lokal) dengan interface client.models.generate_content(model=..., contents=...)
+
+# tests/fake_llm.py
+import re
+import threading
+import time
+
+
+class FakeAPIError(Exception):
+    """Meniru google.genai.errors.APIError: kode HTTP di .code, status gRPC di .status."""
+
+    def __init__(self, code, status, message=""):
+        super().__init__(f"{code} {status}. {message}")
+        self.code = code
+        self.status = status
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeLLMClient:
+    """
+    Gagal `failures` kali per prompt (dengan error dari `error_factory`) lalu
+    mengembalikan `responder(prompt)`. Semua panggilan dicatat di `calls`.
+    """
+
+    def __init__(self, responder, failures=0, error_factory=None, latency=0.0):
+        self.responder = responder
+        self.failures = failures
+        self.error_factory = error_factory or (lambda: FakeAPIError(503, "UNAVAILABLE"))
+        self.latency = latency
+        self.calls = []
+        self._failed = {}
+        self._lock = threading.Lock()
+        self.models = self
+
+    def generate_content(self, model, contents):
+        with self._lock:
+            self.calls.append((time.monotonic(), model, contents))
+            failed = self._failed.get(contents, 0)
+            if failed < self.failures:
+                self._failed[contents] = failed + 1
+                raise self.error_factory()
+        if self.latency:
+            time.sleep(self.latency)
+        return FakeResponse(self.responder(contents))
+
+
+def model_from_prompt(prompt):
+    """Nama model dari baris 'Model: ...' di prompt rekomendasi."""
+    match = re.search(r"^Model: (.+)$", prompt, re.MULTILINE)
+    return match.group(1) if match else None
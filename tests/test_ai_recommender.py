@@ -0,0 +1,113 @@
+import json
+import time
+
+import pytest
+
+import ai_recommender
+import llm_cache
+from fake_llm import FakeAPIError, FakeLLMClient, model_from_prompt
+
+
+@pytest.fixture(autouse=True)
+def no_backoff_or_cache(monkeypatch):
+    monkeypatch.setattr(ai_recommender, "GEMINI_BACKOFF_BASE", 0.0)
+    monkeypatch.setattr(llm_cache, "CACHE_ENABLED", False)
+
+
+def test_transient_errors_are_retried_until_success():
+    client = FakeLLMClient(lambda prompt: "ok", failures=2)
+    assert ai_recommender._call_gemini("p", llm_client=client, max_retries=3) == "ok"
+    assert len(client.calls) == 3
+
+
+def test_retries_stop_after_max_retries():
+    client = FakeLLMClient(lambda prompt: "ok", failures=10)
+    result = json.loads(ai_recommender._call_gemini("p", llm_client=client, max_retries=2))
+    assert "error" in result
+    assert len(client.calls) == 3
+
+
+@pytest.mark.parametrize("error", [
+    FakeAPIError(400, "INVALID_ARGUMENT", "INTERNAL field name is not allowed"),
+    ValueError("INTERNAL parser state"),
+])
+def test_non_transient_errors_are_not_retried(error):
+    client = FakeLLMClient(lambda prompt: "ok", failures=1, error_factory=lambda: error)
+    result = json.loads(ai_recommender._call_gemini("p", llm_client=client, max_retries=3))
+    assert "error" in result
+    assert len(client.calls) == 1
+
+
+@pytest.mark.parametrize("error", [
+    FakeAPIError(429, "RESOURCE_EXHAUSTED"),
+    FakeAPIError(None, "INTERNAL"),
+    TimeoutError("timed out"),
+])
+def test_transient_classification(error):
+    assert ai_recommender._is_transient(error)
+
+
+def test_backoff_grows_exponentially(monkeypatch):
+    delays = []
+    monkeypatch.setattr(ai_recommender, "GEMINI_BACKOFF_BASE", 1.0)
+    monkeypatch.setattr(ai_recommender.time, "sleep", delays.append)
+    client = FakeLLMClient(lambda prompt: "ok", failures=3)
+    assert ai_recommender._call_gemini("p", llm_client=client, max_retries=3) == "ok"
+    # jitter: delay ∈ [0.5, 1.0] × base × 2^attempt
+    assert len(delays) == 3
+    for attempt, delay in enumerate(delays):
+        assert 0.5 * 2 ** attempt <= delay <= 2 ** attempt
+
+
+def test_concurrent_results_keep_payload_order():
+    def responder(prompt):
+        return json.dumps({"primary": [{"action": model_from_prompt(prompt)}]})
+
+    client = FakeLLMClient(responder, failures=1, latency=0.01)
+    payloads = [(f"model-{i}", "Safe", {"Safe": 1.0}, ["Safe"], {"i": i}) for i in range(12)]
+    results = list(ai_recommender.generate_recommendations_concurrently(
+        payloads, concurrency=4, rpm=0, llm_client=client
+    ))
+    assert [payload for payload, _ in results] == payloads
+    assert [res["primary"][0]["action"] for _, res in results] == [p[0] for p in payloads]
+    # setiap payload gagal sekali lalu berhasil
+    assert len(client.calls) == 2 * len(payloads)
+
+
+def test_token_bucket_spaces_requests():
+    bucket = ai_recommender.TokenBucket(10.0, capacity=1)
+    started = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    # token pertama langsung tersedia, tiga berikutnya masing-masing ~0.1 detik
+    assert time.monotonic() - started >= 0.25
+
+
+def test_rpm_limit_applies_to_concurrent_calls():
+    client = FakeLLMClient(lambda prompt: json.dumps({"primary": []}))
+    payloads = [(f"model-{i}", "Safe", {"Safe": 1.0}, ["Safe"], {}) for i in range(2)]
+    list(ai_recommender.generate_recommendations_concurrently(
+        payloads, concurrency=2, rpm=60, llm_client=client
+    ))
+    # 60 rpm → kapasitas bucket 1, isi ulang 1/detik: request ke-2 menunggu ~1 detik
+    times = sorted(t for t, _, _ in client.calls)
+    assert times[1] - times[0] >= 0.9
+
+
+def test_failed_generation_is_retried_on_next_run(workdir, monkeypatch):
+    import main_entry
+    import storage
+
+    prediction = {"Timestamp": "2025-11-11 10:00:00", "Model": "weather", "Prediction": "Safe",
+                  "Probabilities": {"Safe": 0.9, "Caution": 0.1}, "Inputs": {"Temperature_C": 30}}
+    monkeypatch.setattr(main_entry, "load_input", lambda: iter([prediction]))
+
+    down = FakeLLMClient(lambda prompt: "{}", failures=10)
+    main_entry.generate_all_recommendations(concurrency=1, llm_client=down)
+    assert storage.count_recommendations() == 0
+
+    healthy = FakeLLMClient(lambda prompt: json.dumps({"primary": [{"action": "lanjut"}]}))
+    main_entry.generate_all_recommendations(concurrency=1, llm_client=healthy)
+    assert len(healthy.calls) == 1
+    [rec] = storage.query_recommendations()
+    assert rec["recommendations"] == {"primary": [{"action": "lanjut"}]}
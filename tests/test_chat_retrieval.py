@@ -0,0 +1,55 @@
+import prediction_log
+import storage
+from chat_retrieval import ContextRetriever
+
+
+def _prediction(i, model="weather"):
+    return {"Timestamp": f"2025-01-01T00:00:{i:02d}", "Model": model, "Prediction": "Safe", "i": i}
+
+
+def _log_docs(retriever):
+    return sorted(d.record["i"] for d in retriever.index.docs.values() if d.kind == "prediction")
+
+
+def test_log_is_indexed_incrementally_across_rotation(workdir, monkeypatch):
+    retriever = ContextRetriever()
+    prediction_log.append_predictions([_prediction(i) for i in range(3)])
+    retriever.refresh()
+    assert _log_docs(retriever) == [0, 1, 2]
+
+    # hanya byte baru yang dibaca
+    read_offsets = []
+    original = prediction_log.iter_log_records
+    monkeypatch.setattr("prediction_log.iter_log_records",
+                        lambda path, offset=0: read_offsets.append(offset) or original(path, offset))
+    prediction_log.append_predictions([_prediction(3)])
+    retriever.refresh()
+    assert _log_docs(retriever) == [0, 1, 2, 3]
+    assert read_offsets and read_offsets[0] > 0
+
+    # rotasi (rename) tidak membuat segmen dibaca ulang
+    read_offsets.clear()
+    prediction_log.rotate_log()
+    prediction_log.append_predictions([_prediction(4)])
+    retriever.refresh()
+    assert _log_docs(retriever) == [0, 1, 2, 3, 4]
+    assert read_offsets == [0]   # hanya file aktif yang baru
+
+
+def test_recommendations_refresh_only_changed_rows(workdir):
+    retriever = ContextRetriever()
+    storage.insert_recommendations([
+        {"id": "a", "status": "pending", "model": "road", "timestamp": "2025-01-01"},
+        {"id": "b", "status": "pending", "model": "road", "timestamp": "2025-01-01"},
+    ])
+    retriever.refresh()
+    rec = storage.get_recommendation("a")
+    rec["status"] = "approved"
+    storage.update_recommendation(rec)
+    retriever.refresh()
+    statuses = {d.record["id"]: d.status for d in retriever.index.docs.values() if d.kind == "recommendation"}
+    assert statuses == {"a": "approved", "b": "pending"}
+
+    storage.clear_recommendations()
+    retriever.refresh()
+    assert not [d for d in retriever.index.docs.values() if d.kind == "recommendation"]
@@ -0,0 +1,34 @@
+import pytest
+
+import ChatBox
+import prediction_log
+
+
+@pytest.fixture
+def history(workdir):
+    prediction_log.append_predictions([
+        {"Timestamp": "2025-01-01 08:00:00", "Model": "weather", "Prediction": "Safe"},
+        {"Timestamp": "2025-01-02 08:00:00", "Model": "weather", "Prediction": "Storm"},
+        {"Timestamp": "2025-01-02 09:00:00", "Model": "road", "Prediction": "Safe"},
+    ])
+
+
+@pytest.mark.parametrize("question", [
+    "how many weather predictions were there last week?",
+    "how many road predictions in the last 3 days",
+    "berapa prediksi weather minggu lalu",
+    "berapa prediksi weather 3 hari terakhir",
+    "prediksi terakhir weather sejak 2025-01-01",
+    "berapa rekomendasi weather hari ini",
+])
+def test_unparsed_or_unsupported_time_phrases_go_to_llm(history, question):
+    assert ChatBox.answer_locally(question) is None
+
+
+def test_count_and_latest_answers(history):
+    assert ChatBox.answer_locally("berapa prediksi weather") == \
+        "Total 2 prediksi model weather sepanjang data (Safe: 1, Storm: 1)."
+    assert ChatBox.answer_locally("berapa prediksi weather pada 2025-01-02") == \
+        "Total 1 prediksi model weather pada 2025-01-02 (Storm: 1)."
+    assert ChatBox.answer_locally("what is the latest weather prediction?") == \
+        "Prediksi terakhir model weather (2025-01-02 08:00:00): Storm."
@@ -0,0 +1,225 @@
+import os
+
+import numpy as np
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("sklearn")
+
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+import prediction_utils
+from forest_compiler import CompiledForest, export_pipeline, flatten_forest, load_forest, save_forest
+import pipeline_compiler
+from pipeline_compiler import CompiledPipeline, compile_pipeline, load_exported_pipeline
+
+NUMERIC = ["Suhu", "Curah_Hujan", "Angin"]
+CATEGORICAL = ["Kondisi"]
+FEATURES = ["Suhu", "Kondisi", "Curah_Hujan", "Angin"]
+BATCH_SIZES = [1, 255, 256, 257]
+
+
+def _frame(n, seed):
+    rng = np.random.default_rng(seed)
+    data = {name: rng.normal(10, 5, n) for name in NUMERIC}
+    data["Kondisi"] = rng.choice(["Clear", "Rainy", "Storm"], n).astype(object)
+    frame = pd.DataFrame(data)[FEATURES]
+    # nilai kosong di kolom numerik: jalur missing_go_to_left forest sklearn
+    frame.loc[rng.random(n) < 0.1, "Curah_Hujan"] = np.nan
+    frame.loc[rng.random(n) < 0.05, "Suhu"] = np.nan
+    return frame
+
+
+@pytest.fixture
+def model():
+    train = _frame(400, seed=0)
+    labels = np.random.default_rng(1).choice(["Safe", "Caution", "High Risk"], len(train))
+    preprocessor = ColumnTransformer([
+        ("num", StandardScaler(), NUMERIC),
+        ("cat", OneHotEncoder(handle_unknown="ignore"), CATEGORICAL),
+    ])
+    pipeline = Pipeline([
+        ("preprocessor", preprocessor),
+        ("classifier", RandomForestClassifier(n_estimators=15, random_state=0)),
+    ])
+    return pipeline.fit(train, labels)
+
+
+def _rows(frame):
+    return [[None if isinstance(v, float) and np.isnan(v) else v for v in row]
+            for row in frame.itertuples(index=False)]
+
+
+@pytest.mark.parametrize("n", BATCH_SIZES)
+def test_flat_forest_matches_sklearn_predict_proba(model, n):
+    forest = model.steps[-1][1]
+    X = model[:-1].transform(_frame(n, seed=2))
+    assert np.isnan(X).any() or n == 1
+    assert np.array_equal(flatten_forest(forest).predict_proba(X), forest.predict_proba(X))
+
+
+def _pipeline_input(model, rows):
+    # baris kosong diisi seperti di produksi (ModelSchema), lalu lewat pipeline sklearn
+    return prediction_utils.get_model_schema(model, FEATURES).build_frame(rows)
+
+
+@pytest.mark.parametrize("n", BATCH_SIZES)
+def test_compiled_pipeline_matches_pipeline(model, n):
+    rows = _rows(_frame(n, seed=3))
+    expected = model.predict_proba(_pipeline_input(model, rows))
+    compiled = compile_pipeline(model, FEATURES)
+
+    assert isinstance(compiled.estimator, CompiledForest)
+    assert np.array_equal(compiled.predict_proba(rows), expected)
+
+
+def _dump(model, path):
+    joblib = pytest.importorskip("joblib")
+    joblib.dump({"model": model, "feature_order": FEATURES}, str(path))
+    return str(path)
+
+
+def test_fast_path_compiled_on_first_prediction_replaces_registry_model(model, tmp_path, monkeypatch):
+    path = _dump(model, tmp_path / "model_uji.pkl")
+    rows = _rows(_frame(300, seed=4))
+    expected = model.predict_proba(_pipeline_input(model, rows))
+
+    entry = prediction_utils._load_entry("uji", {"features": FEATURES}, path, None)
+    assert not isinstance(entry["model"], CompiledPipeline)   # belum dikompilasi saat dimuat
+    assert entry["stats"]["forest"] is None
+    monkeypatch.setitem(prediction_utils._MODEL_REGISTRY, "uji", entry)
+
+    outputs = prediction_utils.predict_batch_with_model(entry["model"], rows, FEATURES)
+    promoted = prediction_utils._MODEL_REGISTRY["uji"]
+    assert isinstance(promoted["model"], CompiledPipeline)
+    assert isinstance(promoted["model"].estimator, CompiledForest)
+    assert promoted["stats"]["forest"] == "memory"
+    # Pipeline & preprocessor sklearn dilepas; hanya forest-nya yang tersisa untuk batch besar
+    assert promoted["model"].batch_estimator is entry["model"].steps[-1][1]
+    assert [v for v in vars(promoted["model"]).values() if type(v).__module__.startswith("sklearn")] \
+        == [promoted["model"].batch_estimator]
+    assert [label for label, _ in outputs] == list(model.classes_.take(expected.argmax(axis=1)))
+    assert np.array_equal([[p[c] for c in model.classes_] for _, p in outputs], expected)
+
+
+def test_large_batches_use_the_sklearn_forest(model, monkeypatch):
+    monkeypatch.setattr(pipeline_compiler, "FOREST_MAX_BATCH", 255)
+    compiled = compile_pipeline(model, FEATURES)
+    assert compiled.estimator_for(255) is compiled.estimator
+    assert compiled.estimator_for(256) is model.steps[-1][1]
+    rows = _rows(_frame(256, seed=9))
+    expected = model.predict_proba(_pipeline_input(model, rows))
+    outputs = prediction_utils.predict_batch_with_model(compiled, rows, FEATURES)
+    assert np.array_equal([[p[c] for c in model.classes_] for _, p in outputs], expected)
+
+
+def test_exported_model_loads_sklearn_forest_for_large_batches(model, workdir, monkeypatch):
+    monkeypatch.setattr(pipeline_compiler, "FOREST_MAX_BATCH", 255)
+    path = _dump(model, workdir / "model_uji.pkl")
+    export_pipeline(model, FEATURES, path, "models/compiled/uji")
+    rows = _rows(_frame(300, seed=10))
+    expected = model.predict_proba(_pipeline_input(model, rows))
+
+    loaded = load_exported_pipeline("uji", path)
+    assert loaded.batch_estimator is None               # .pkl belum dibaca saat dimuat
+    assert np.array_equal(loaded.predict_proba(rows), expected)
+    assert type(loaded.batch_estimator).__name__ == "RandomForestClassifier"
+
+    # .pkl diganti setelah ekspor dimuat: forest sklearn baru tidak cocok dengan tabel ekspor
+    stale = load_exported_pipeline("uji", path)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    assert stale.estimator_for(300) is stale.estimator
+    assert np.array_equal(stale.predict_proba(rows), expected)
+
+
+def test_exported_model_loads_without_pickle(model, workdir, monkeypatch):
+    path = _dump(model, workdir / "model_uji.pkl")
+    rows = _rows(_frame(257, seed=6))
+    expected = model.predict_proba(_pipeline_input(model, rows))
+    export_pipeline(model, FEATURES, path, "models/compiled/uji")
+
+    def no_pickle(_):
+        raise AssertionError(".pkl tidak boleh dibaca jika hasil ekspor masih segar")
+
+    monkeypatch.setattr(prediction_utils, "load_model", no_pickle)
+    entry = prediction_utils._load_entry("uji", {"features": FEATURES}, path, None)
+    loaded = entry["model"]
+    assert isinstance(loaded, CompiledPipeline) and isinstance(loaded.estimator.value, np.memmap)
+    assert entry["stats"]["source"] == "compiled" and entry["stats"]["forest"] == "mmap"
+    for n in BATCH_SIZES:
+        assert np.array_equal(loaded.predict_proba(rows[:n]), expected[:n])
+    labels = [label for label, _ in prediction_utils.predict_batch_with_model(loaded, rows, FEATURES)]
+    assert labels == list(model.classes_.take(expected.argmax(axis=1)))
+    assert all(type(label) is type(model.classes_[0]) for label in labels)
+
+    # .pkl berubah → hasil ekspor basi, tidak dipakai
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    assert load_exported_pipeline("uji", path) is None
+
+
+def test_corrupt_export_falls_back_to_pickle(model, workdir):
+    path = _dump(model, workdir / "model_uji.pkl")
+    export_pipeline(model, FEATURES, path, "models/compiled/uji")
+    with open("models/compiled/uji/value.npy", "r+b") as f:
+        f.truncate(100)
+
+    entry = prediction_utils._load_entry("uji", {"features": FEATURES}, path, None)
+    assert entry["stats"]["source"] == "pickle"
+    rows = _rows(_frame(5, seed=7))
+    expected = model.predict_proba(_pipeline_input(model, rows))
+    outputs = prediction_utils.predict_batch_with_model(entry["model"], rows, FEATURES)
+    assert np.array_equal([[p[c] for c in model.classes_] for _, p in outputs], expected)
+
+
+def test_saved_forest_loads_with_mmap(model, tmp_path):
+    forest = flatten_forest(model.steps[-1][1])
+    save_forest(forest, str(tmp_path))
+    loaded = load_forest(str(tmp_path), mmap=True)
+
+    X = model[:-1].transform(_frame(257, seed=5))
+    assert isinstance(loaded.value, np.memmap)
+    assert np.array_equal(loaded.predict_proba(X), forest.predict_proba(X))
+
+
+def test_saving_over_a_mapped_export_keeps_the_old_mapping_valid(model, tmp_path):
+    forest = flatten_forest(model.steps[-1][1])
+    out_dir = str(tmp_path / "uji")
+    save_forest(forest, out_dir)
+    mapped = load_forest(out_dir, mmap=True)
+    before = os.stat(os.path.join(out_dir, "value.npy")).st_ino
+
+    save_forest(forest, out_dir)   # ekspor ulang selagi array lama masih di-mmap
+    assert os.stat(os.path.join(out_dir, "value.npy")).st_ino != before
+    X = model[:-1].transform(_frame(50, seed=8))
+    assert np.array_equal(mapped.predict_proba(X), forest.predict_proba(X))
+    assert sorted(os.listdir(tmp_path)) == ["uji"]
+
+
+def test_export_failing_reload_check_is_not_published(model, workdir, monkeypatch):
+    path = _dump(model, workdir / "model_uji.pkl")
+    export_pipeline(model, FEATURES, path, "models/compiled/uji")
+    with open("models/compiled/uji/meta.json", encoding="utf-8") as f:
+        published = f.read()
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1))   # .pkl baru → perlu ekspor ulang
+
+    spec_loader = pipeline_compiler.pipeline_from_spec
+
+    def corrupted_on_reload(spec, forest):
+        compiled = spec_loader(spec, forest)
+        compiled.predict_proba = lambda rows: CompiledPipeline.predict_proba(compiled, rows) + 1.0
+        return compiled
+
+    monkeypatch.setattr(pipeline_compiler, "pipeline_from_spec", corrupted_on_reload)
+    with pytest.raises(ValueError, match="tidak cocok setelah dimuat ulang"):
+        export_pipeline(model, FEATURES, path, "models/compiled/uji")
+
+    with open("models/compiled/uji/meta.json", encoding="utf-8") as f:
+        assert f.read() == published       # artefak gagal tidak menggantikan yang lama
+    assert os.listdir("models/compiled") == ["uji"]
+    assert load_exported_pipeline("uji", path) is None   # dan yang lama basi, jadi .pkl dipakai
@@ -0,0 +1,27 @@
+import asyncio
+import threading
+
+from inference_pool import InferencePool
+
+
+def test_metrics_count_running_and_backlog_without_executor_internals():
+    release = threading.Event()
+
+    async def scenario():
+        pool = InferencePool(workers=2, per_model=4)
+        tasks = [asyncio.create_task(pool.run("weather", release.wait, 5)) for _ in range(6)]
+        await asyncio.sleep(0.05)
+        during = pool.metrics()
+        release.set()
+        await asyncio.gather(*tasks)
+        after = pool.metrics()
+        pool.shutdown()
+        return during, after
+
+    during, after = asyncio.run(scenario())
+    # 4 pemegang semaphore: 2 dieksekusi worker, 2 menunggu di executor; 2 lagi menunggu semaphore
+    assert during["executor_running"] == 2
+    assert during["executor_backlog"] == 2
+    assert during["models"]["weather"]["queue_depth"] == 2
+    assert after["executor_running"] == 0 and after["executor_backlog"] == 0
+    assert after["models"]["weather"]["completed"] == 6
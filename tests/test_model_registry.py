@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+pytest.importorskip("sklearn")
+joblib = pytest.importorskip("joblib")
+
+from sklearn.dummy import DummyClassifier
+
+import prediction_utils
+
+FEATURES = ["Suhu", "Angin"]
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(prediction_utils, "_MODEL_REGISTRY", {})
+    monkeypatch.setattr(prediction_utils, "_LOAD_STATUS", {})
+    monkeypatch.setattr(prediction_utils, "_MODEL_LOCKS", {})
+
+
+def test_warm_up_skips_failed_models_and_reports_health(workdir, registry, monkeypatch, capsys):
+    model = DummyClassifier(strategy="prior").fit([[0, 0], [1, 1]], ["Safe", "Caution"])
+    joblib.dump({"model": model, "feature_order": FEATURES}, "model_ok.pkl")
+    monkeypatch.setattr(prediction_utils, "models_config", [
+        {"name": "ok", "file": "model_ok.pkl", "features": FEATURES},
+        {"name": "hilang", "file": "model_hilang.pkl", "features": FEATURES},
+    ])
+
+    assert prediction_utils.warm_up_models() == ["ok"]
+    out = capsys.readouterr().out
+    assert "Gagal memuat model 'hilang'" in out and "1/2 model siap" in out
+
+    health = prediction_utils.model_health()
+    assert health["status"] == "degraded" and health["ready"] == 1
+    assert health["models"]["hilang"]["state"] == "failed"
+    ok = health["models"]["ok"]
+    assert ok["state"] == "ready" and ok["load_ms"] >= 0 and ok["load_cpu_ms"] >= 0
+    assert prediction_utils.model_load_metrics()["ok"]["source"] == "pickle"
+
+
+def test_registry_is_not_reloaded_when_reload_on_change_is_off(workdir, registry, monkeypatch):
+    model = DummyClassifier(strategy="prior").fit([[0, 0], [1, 1]], ["Safe", "Caution"])
+    joblib.dump({"model": model, "feature_order": FEATURES}, "model_ok.pkl")
+    monkeypatch.setattr(prediction_utils, "models_config", [
+        {"name": "ok", "file": "model_ok.pkl", "features": FEATURES},
+    ])
+    loaded, _ = prediction_utils.get_model("ok")
+
+    joblib.dump({"model": model, "feature_order": FEATURES[::-1]}, "model_ok.pkl")
+    monkeypatch.setattr(prediction_utils, "RELOAD_ON_CHANGE", False)
+    assert prediction_utils.get_model("ok") == (loaded, FEATURES)
+    monkeypatch.setattr(prediction_utils, "RELOAD_ON_CHANGE", True)
+    assert prediction_utils.get_model("ok")[1] == FEATURES[::-1]
+
+
+def test_warm_up_loads_models_in_parallel_threads(registry, monkeypatch):
+    names = ["a", "b", "c", "d"]
+    monkeypatch.setattr(prediction_utils, "models_config", [{"name": n, "file": n, "features": []} for n in names])
+    monkeypatch.setattr(prediction_utils, "_preimport", lambda *args: None)
+    monkeypatch.setattr(prediction_utils, "LOAD_WORKERS", 4)
+    barrier = threading.Barrier(4, timeout=5)
+    threads = set()
+
+    def load(name, compile_fast_path=False):
+        threads.add(threading.current_thread().name)
+        barrier.wait()   # hanya lolos jika keempat model dimuat bersamaan
+        if name == "c":
+            raise RuntimeError("rusak")
+        stats = {"load_ms": 1.0, "load_cpu_ms": 1.0, "source": "pickle", "forest": None, "rss_mb": None}
+        prediction_utils._MODEL_REGISTRY[name] = {"signature": None, "stats": stats}
+
+    monkeypatch.setattr(prediction_utils, "_warm_up_one", load)
+    assert prediction_utils.warm_up_models() == ["a", "b", "d"]
+    assert len(threads) == 4
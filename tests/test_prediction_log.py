@@ -0,0 +1,36 @@
+import pytest
+
+import prediction_log
+
+pytest.importorskip("msgpack")
+
+
+def _records(n, start=0):
+    return [{"Model": "weather", "Prediction": "Safe", "i": i} for i in range(start, start + n)]
+
+
+def test_corrupt_frame_in_middle_stops_segment(tmp_path, capsys):
+    path = str(tmp_path / "log.msgpack")
+    payload = prediction_log.encode_records(_records(5), path)
+    frame = len(prediction_log.encode_records(_records(1), path))
+    # rusak body frame ketiga
+    corrupted = bytearray(payload)
+    corrupted[2 * frame + 4:3 * frame] = b"\xc1" * (frame - 4)
+    with open(path, "wb") as f:
+        f.write(bytes(corrupted))
+
+    assert [r["i"] for r in prediction_log.iter_log_file(path)] == [0, 1]
+    assert "frame rusak" in capsys.readouterr().out
+
+
+def test_torn_tail_is_truncated_before_append(tmp_path):
+    path = str(tmp_path / "log.msgpack")
+    prediction_log.append_predictions(_records(3), path)
+    # crash di tengah write: separuh frame tertinggal di akhir file
+    torn = prediction_log.encode_records(_records(1, start=99), path)
+    with open(path, "ab") as f:
+        f.write(torn[: len(torn) // 2])
+    prediction_log._CHECKED_FRAMES.clear()   # proses lain yang melanjutkan append
+
+    prediction_log.append_predictions(_records(2, start=3), path)
+    assert [r["i"] for r in prediction_log.iter_log_file(path)] == [0, 1, 2, 3, 4]
@@ -0,0 +1,40 @@
+import socket
+
+import pytest
+
+serve = pytest.importorskip("serve")
+
+
+@pytest.fixture
+def server():
+    sock = socket.socket()
+    srv = serve.PreforkServer("app:app", sock, 2)
+    yield srv
+    sock.close()
+
+
+def test_failed_starts_back_off_exponentially(server, monkeypatch):
+    times = iter([100.0, 100.1, 100.2, 200.0])
+    monkeypatch.setattr(serve.time, "monotonic", lambda: next(times))
+    for _ in range(3):
+        server._on_crash(1, 1, uptime=0.1)
+    assert server._next_spawn == pytest.approx(100.2 + 2.0)   # 0.5s → 1s → 2s
+    assert not server._stopping
+
+    # worker yang sempat berjalan lama lalu mati: backoff direset
+    server._next_spawn = 0.0
+    server._on_crash(1, 1, uptime=3600)
+    assert server._failed_starts == 0
+    assert server._next_spawn == 200.0
+
+
+def test_gives_up_after_too_many_crashes_in_window(server, monkeypatch):
+    monkeypatch.setattr(serve, "MAX_CRASHES", 3)
+    times = iter([0.0, 100.0, 100.5, 101.0])
+    monkeypatch.setattr(serve.time, "monotonic", lambda: next(times))
+    server._on_crash(1, 1, uptime=0.1)
+    server._on_crash(1, 1, uptime=0.1)   # crash pertama sudah di luar CRASH_WINDOW
+    server._on_crash(1, 1, uptime=0.1)
+    assert not server._stopping
+    server._on_crash(1, 1, uptime=0.1)
+    assert server._stopping and server.exit_code == 1
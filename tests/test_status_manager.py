@@ -0,0 +1,53 @@
+import pytest
+
+import status_manager
+import storage
+
+
+@pytest.fixture
+def rec(workdir):
+    rec = {"id": "r1", "model": "weather", "prediction": "Safe", "status": "pending_review_mine_planner",
+           "version": 1, "review_history": []}
+    storage.insert_recommendation(rec)
+    return rec
+
+
+def _bump(rec_id, status):
+    current = storage.get_recommendation(rec_id)
+    version = current["version"]
+    current.update(status=status, version=version + 1)
+    storage.update_recommendation(current, expected_version=version)
+
+
+def test_review_is_reapplied_when_only_the_version_changed(rec, monkeypatch):
+    apply_review = status_manager._apply_review
+
+    def concurrent_edit(r, *args):
+        apply_review(r, *args)
+        if r["version"] == 2:   # percobaan pertama: proses lain menulis lebih dulu (status sama)
+            _bump("r1", "pending_review_mine_planner")
+
+    monkeypatch.setattr(status_manager, "_apply_review", concurrent_edit)
+    updated = status_manager.update_status_for_recommendation("r1", "mine_planner", "approve")
+    assert updated["status"] == "pending_review_shipping_planner" and updated["version"] == 3
+
+
+def test_review_conflicts_when_status_changed_underneath(rec, monkeypatch):
+    apply_review = status_manager._apply_review
+
+    def concurrent_review(r, *args):
+        apply_review(r, *args)
+        if r["version"] == 2:   # reviewer lain mengembalikan record ke revisi AI
+            _bump("r1", "awaiting_revision_ai")
+
+    monkeypatch.setattr(status_manager, "_apply_review", concurrent_review)
+    with pytest.raises(storage.ConcurrentUpdateError):
+        status_manager.update_status_for_recommendation("r1", "mine_planner", "approve")
+    assert storage.get_recommendation("r1")["status"] == "awaiting_revision_ai"
+
+
+def test_stale_expected_status_is_rejected(rec):
+    with pytest.raises(storage.ConcurrentUpdateError):
+        status_manager.update_status_for_recommendation(
+            "r1", "shipping_planner", "approve", expected_status="pending_review_shipping_planner")
+    assert storage.get_recommendation("r1")["version"] == 1
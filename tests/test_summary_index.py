@@ -0,0 +1,56 @@
+import json
+
+import prediction_log
+import review_manager
+import summary_index
+
+
+def _prediction(i, model):
+    return {"Timestamp": f"2025-01-0{1 + i % 3}T00:00:00", "Model": model, "Prediction": "Safe"}
+
+
+def _history():
+    models = ["weather"] * 3 + ["road"] * 2 + ["vessel"] * 7
+    return [_prediction(i, m) for i, m in enumerate(models)]
+
+
+def test_existing_history_is_counted_on_first_use(workdir):
+    prediction_log.append_predictions(_history())
+    prediction_log.append_predictions([_prediction(0, "weather")])
+    assert summary_index.prediction_counts_by_model() == {"weather": 4, "road": 2, "vessel": 7}
+
+
+def test_summary_catches_up_with_new_log_data_and_rotation(workdir):
+    prediction_log.append_predictions(_history())
+    assert summary_index.prediction_counts_by_model()["weather"] == 3
+
+    prediction_log.rotate_log()
+    prediction_log.append_predictions([_prediction(0, "weather"), _prediction(1, "road")])
+    assert summary_index.prediction_counts_by_model() == {"weather": 4, "road": 3, "vessel": 7}
+
+
+def test_legacy_log_and_old_summary_format_are_rebuilt(workdir):
+    with open(prediction_log.LEGACY_LOG_PATH, "w", encoding="utf-8") as f:
+        json.dump([_prediction(0, "weather")], f)
+    # ringkasan format lama (tanpa cursor) yang tertinggal dari data sebenarnya
+    with open(summary_index.SUMMARY_PATH, "w", encoding="utf-8") as f:
+        json.dump({"predictions": {"by_day": {"2025-01-01": {"weather": {"Safe": 1}}}, "latest": {}},
+                   "reviews": {"by_day": {}}}, f)
+    prediction_log.append_predictions(_history())
+    assert summary_index.prediction_counts_by_model() == {"weather": 4, "road": 2, "vessel": 7}
+
+
+def test_reviews_are_counted_incrementally(workdir):
+    for action in ("approve", "reject"):
+        review_manager.save_review({"id": action, "role": "mine_planner", "action": action,
+                                    "timestamp": "2025-01-01T00:00:00"})
+    assert summary_index.review_counts("mine_planner") == {"approve": 1, "reject": 1}
+    review_manager.save_review({"id": "x", "role": "mine_planner", "action": "approve",
+                                "timestamp": "2025-01-02T00:00:00"})
+    assert summary_index.review_counts("mine_planner") == {"approve": 2, "reject": 1}
+
+
+def test_append_does_not_write_summary(workdir):
+    prediction_log.append_predictions(_history())
+    assert not (workdir / summary_index.SUMMARY_PATH).exists()
+    assert summary_index.rebuild_summary()["cursors"]["logs"]
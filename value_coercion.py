@@ -0,0 +1,34 @@
+# konversi nilai input mentah (kosong/teks/angka), dipakai bersama prediction_utils & pipeline_compiler
+
+# value_coercion.py
+
+# Pengisi input kosong/tidak valid: kolom numerik → 0.0, kolom kategorikal → "Unknown"
+NUMERIC_FILL = 0.0
+CATEGORICAL_FILL = "Unknown"
+
+NULL_STRINGS = frozenset({"", "None", "none", "NaN", "nan"})
+
+
+def is_null(value):
+    if value is None:
+        return True
+    if isinstance(value, str):
+        return value in NULL_STRINGS
+    if isinstance(value, float):
+        return value != value  # NaN (termasuk np.nan / np.float64)
+    return False
+
+
+def to_float(value):
+    if is_null(value):
+        return 0.0
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def coerce_numeric(value):
+    """Konversi ke float; nilai kosong/tidak valid/NaN menjadi NUMERIC_FILL"""
+    value = to_float(value)
+    return value if value == value else NUMERIC_FILL